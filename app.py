@@ -1,12 +1,46 @@
 import streamlit as st
-import google.generativeai as genai
+import atexit
+import logging
+import sqlite3
 import time
-import random
-import base64
 from pathlib import Path
 
+from integrasalud import activos, config, metricas
+from integrasalud.cache_respuestas import CacheRespuestas, version_prompt
+from integrasalud.catalogo import Catalogo, FuenteCatalogo
+from integrasalud.circuito import Circuito, CircuitoAbierto
+from integrasalud.cliente import (
+    ERRORES_TRANSITORIOS, MODELO_POR_DEFECTO, ClienteGemini, construir_prompt, parametros_desde_config,
+)
+from integrasalud.conversacion import MemoriaConversacion, es_seguimiento
+from integrasalud.ejecutor import EjecutorLLM, PlazoAgotadoLLM, SaturacionLLM
+from integrasalud.historial import HistorialChat, html_contenedor, html_turno
+from integrasalud.registro_consultas import (
+    RegistroConsultas, leer_promovidas, promover, promover_periodicamente, sembrado_promovidas,
+)
+from integrasalud.texto import normalizar
+from integrasalud.turnos import AsignadorTurnos, CodigoAgotado
+from integrasalud.vuelo_unico import GrupoVueloUnico
+
+DIRECTORIO_APP = Path(__file__).parent
+logger = logging.getLogger("integrasalud.app")
+inicio_rerun = time.perf_counter()
+
+# --- ACTIVOS (se codifican una sola vez por proceso) ---
+@st.cache_resource(show_spinner=False)
+def cargar_favicon():
+    return activos.preparar_favicon(DIRECTORIO_APP / "favicon.png")
+
+@st.cache_resource(show_spinner=False)
+def cargar_encabezado():
+    with metricas.medir("integrasalud_activos_segundos"):
+        encabezado = activos.preparar_encabezado(DIRECTORIO_APP)
+    if encabezado:
+        metricas.REGISTRO.medidor("integrasalud_activos_bytes_ahorrados_por_rerun", lambda: encabezado["bytes_ahorrados_por_rerun"])
+    return encabezado
+
 # --- CONFIGURACIÓN DE LA PÁGINA ---
-st.set_page_config(page_title="IntegraSalud SDE", page_icon="favicon.png", layout="wide")
+st.set_page_config(page_title="IntegraSalud SDE", page_icon=cargar_favicon(), layout="wide")
 
 # --- ESTILOS CSS ---
 custom_css = """
@@ -193,162 +227,157 @@ st.markdown(custom_css, unsafe_allow_html=True)
 
 
 # --- API KEY ---
-api_key = st.secrets.get("GOOGLE_API_KEY")
-
-# --- LÓGICA ONLINE ---
-model = None
-online_mode_ready = False 
-
-if api_key == api_key:
-    try:
-        genai.configure(api_key=api_key)
-        model = genai.GenerativeModel("gemini-2.0-flash")
-        online_mode_ready = True
-
-    except Exception as e:
-        st.write("La clave fue encontrada, pero es inválida o hay otro problema. El error técnico es:")
-        st.exception(e) 
-else:
+try:
+    api_key = st.secrets.get("GOOGLE_API_KEY")
+except FileNotFoundError:  # no hay secrets.toml
+    api_key = None
+
+# --- LÓGICA ONLINE (cliente único por proceso) ---
+@st.cache_resource(show_spinner=False)
+def cargar_cliente_gemini(api_key):
+    cliente = ClienteGemini(api_key, config.leer("gemini_modelo", MODELO_POR_DEFECTO), parametros_desde_config())
+    if config.leer("gemini_precalentar", True):
+        cliente.calentar()
+    return cliente
+
+cliente_gemini = cargar_cliente_gemini(api_key)
+model = cliente_gemini.modelo
+online_mode_ready = cliente_gemini.listo
+
+if cliente_gemini.estado == "error":
+    st.write("La clave fue encontrada, pero es inválida o hay otro problema. El error técnico es:")
+    st.exception(cliente_gemini.error)
+elif cliente_gemini.estado == "sin_clave":
     st.error("❌ No se encontró la API Key en los secretos de Streamlit. El modo online no funcionará.")
     st.warning("Asegúrate de que el secreto se llame exactamente 'GOOGLE_API_KEY' y que hayas guardado los cambios y reiniciado la app.")
 
-# --- CONTENIDO DE LAS CATEGORÍAS (Base estática y centros de salud) ---
-CONTENIDO_CATEGORIAS_BASE = {
-    "Salud Sexual": {
-        "emoji": "💬",
-        "titulo": "Asistente de Salud Sexual 🩺💊",
-        "placeholder": "Prueba con 'ITS' o 'anticonceptivo'...",
-        "preguntas_frecuentes": {
-            "its": """
-            Las Infecciones de Transmisión Sexual (ITS) se transmiten de una persona a otra durante las relaciones sexuales. Algunas comunes son VPH, sífilis, y VIH. Muchas no presentan síntomas, por lo que el uso de **preservativo** y los controles médicos son clave.
-            **Recuerda siempre consultar a un profesional de la salud.**
-            """,
-            "ets": """
-            El término "Enfermedades de Transmisión Sexual" (ETS) hoy se conoce como ITS (Infecciones), ya que se puede tener y transmitir una infección sin mostrar síntomas de enfermedad. La prevención es la misma: ¡usar preservativo!
-            **Para un diagnóstico correcto, consulta a un médico/a.**
-            """,
-            "anticonceptivos": """
-            Existen diversos métodos: de barrera (preservativo), hormonales (pastillas, DIU hormonal, implante), y el DIU de Cobre. La pastilla del día después es solo para emergencias.
-            **Un/a ginecólogo/a te puede asesorar para encontrar el método más adecuado para ti.**
-            """,
-            "preservativo": """
-            El preservativo (o condón) es el único método que ofrece **doble protección**: previene embarazos y la mayoría de las ITS. Se consiguen gratis en hospitales y centros de salud públicos.
-            """,
-            "consentimiento": """
-            El consentimiento es un acuerdo **entusiasta, voluntario y claro** para participar en una actividad sexual. Puede retirarse en cualquier momento y el silencio no es un sí. **Sin consentimiento, es abuso.**
-            """
-        },
-        "system_prompt": """
-            **Tu Identidad:** Eres 'IntegraSalud', un asistente virtual educativo sobre **Salud Sexual y Reproductiva**.
-            **Tu Misión:** Proporcionar información clara, precisa, científica, inclusiva y libre de prejuicios.
-            **REGLAS:** No actúes como un médico. Siempre recomienda consultar a un profesional. Si te preguntan por un turno, indica que escriban la palabra 'turno'.
-        """,
-        "centros_de_salud": {
-            "Upa N° 2 B° Cáceres (Capital)": ["Ginecología", "Clínica Médica", "Testeo Rápido ITS"],
-            "CePSI 'Eva Perón' (Capital)": ["Salud Adolescente", "Ginecología"],
-            "Hospital Regional 'Dr. Ramón Carrillo'": ["Ginecología", "Urología", "Infectología"],
-            "CISB La Banda": ["Clínica Médica", "Ginecología", "Testeo Rápido ITS"]
-        }
-    },
-    "Salud Mental": {
-        "emoji": "🧠",
-        "titulo": "Asistente de Bienestar Emocional 🧠💆‍♂️",
-        "placeholder": "Prueba con 'ansiedad' o 'estrés'...",
-        "preguntas_frecuentes": {
-            "ansiedad": """
-            La ansiedad es una reacción emocional normal ante situaciones de estrés o incertidumbre. Sin embargo, cuando es muy intensa, frecuente y afecta tu vida diaria, podría tratarse de un trastorno de ansiedad. Los síntomas comunes incluyen preocupación excesiva, tensión muscular, irritabilidad y problemas para dormir.
-
-            Pequeñas acciones como la respiración profunda, el ejercicio regular y hablar con alguien de confianza pueden ayudar.
-
-            **Es fundamental recordar que un diagnóstico solo puede hacerlo un profesional. Si te sientes así, hablar con un psicólogo/a es el paso más importante.**
-            """,
-            "estrés": """
-            El estrés es la respuesta física y mental del cuerpo a las demandas del entorno. Un poco de estrés puede ser positivo (motivarte a cumplir una meta), pero el estrés crónico (sostenido en el tiempo) puede afectar tu salud física y mental.
-
-            Para manejarlo, prueba identificar las fuentes de estrés, organizar tu tiempo, hacer pausas activas durante el día y practicar alguna actividad que disfrutes.
-
-            **Si sientes que el estrés te desborda, un terapeuta puede enseñarte herramientas efectivas para gestionarlo.**
-            """,
-            "depresión": """
-            La depresión es mucho más que estar triste. Es una condición de salud mental seria que afecta cómo te sientes, piensas y actúas. Los síntomas pueden incluir tristeza persistente, pérdida de interés en actividades que antes disfrutabas, cambios en el apetito o el sueño, y falta de energía.
-
-            Es importante saber que la depresión es tratable y no es un signo de debilidad.
-
-            **Buscar ayuda es un acto de valentía. Habla con un médico o psicólogo; ellos pueden ofrecerte el tratamiento y el apoyo que necesitas.**
-            """
-        },
-        "system_prompt": """
-            **Tu Identidad:** Eres 'IntegraSalud', un asistente virtual de apoyo para el **Bienestar Emocional**.
-            **Tu Misión:** Ofrecer un espacio seguro para que los usuarios se expresen.
-            **REGLAS:** No eres un terapeuta. Jamás diagnostiques. Anima siempre al usuario a buscar ayuda profesional (psicólogo/a, psiquiatra).
-        """,
-        "centros_de_salud": {
-            "Hospital Psiquiátrico 'Diego Alcorta'": ["Psicología", "Psiquiatría", "Terapia de Grupo"],
-            "Centro de Salud Mental 'Dr. C. J. Coronel'": ["Consulta Psicológica", "Apoyo Familiar"],
-            "Consultorios Externos H. Regional": ["Psicología de Adultos", "Psicología Infantil"]
-        }
-    },
-    "Nutrición": {
-        "emoji": "🥗",
-        "titulo": "Asistente Nutricional 🥗💪",
-        "placeholder": "Prueba con 'proteínas' o 'hidratación'...",
-        "preguntas_frecuentes": {
-            "proteínas": """
-            Las proteínas son macronutrientes esenciales para el cuerpo. Actúan como "ladrillos" para construir y reparar músculos, órganos y tejidos. Son clave para el sistema inmune y la producción de hormonas.
-
-            Puedes encontrarlas en alimentos de origen animal (carne, pollo, pescado, huevos, lácteos) y vegetal (legumbres como lentejas y garbanzos, tofu, quinoa, frutos secos).
-
-            **Para saber cuánta proteína necesitas según tu actividad, consulta a un/a nutricionista.**
-            """,
-            "hidratación": """
-            Mantenerse hidratado es fundamental para casi todas las funciones del cuerpo. El agua transporta nutrientes a las células, ayuda a eliminar toxinas y regula la temperatura corporal. La deshidratación puede causar fatiga, dolores de cabeza y falta de concentración.
-
-            Además de agua, también puedes hidratarte con infusiones, caldos, frutas y verduras con alto contenido de agua (como sandía o pepino).
-
-            **Escucha a tu cuerpo: si tienes sed, ¡bebe agua! Un profesional de la salud puede darte pautas más específicas.**
-            """,
-            "carbohidratos": """
-            Los carbohidratos son la principal fuente de combustible del cuerpo, especialmente para el cerebro y los músculos. No todos son iguales:
-            - **Complejos:** Se absorben lentamente, dando energía sostenida. Se encuentran en granos integrales, avena, legumbres y verduras.
-            - **Simples:** Se absorben rápido, dando un pico de energía. Están en azúcares, dulces y harinas refinadas.
-
-            Una dieta saludable prioriza los carbohidratos complejos.
-
-            **Un/a nutricionista puede ayudarte a equilibrar tu consumo de carbohidratos de forma saludable.**
-            """
-        },
-        "system_prompt": """
-            **Tu Identidad:** Eres 'IntegraSalud', un asistente virtual educativo sobre **Nutrición y Alimentación Saludable**.
-            **Tu Misión:** Proporcionar información basada en evidencia científica.
-            **REGLAS:** No eres un nutricionista. No puedes crear planes de dieta personalizados. Siempre recomienda consultar a un profesional.
-        """,
-        "centros_de_salud": {
-            "Hospital Regional 'Dr. Ramón Carrillo'": ["Nutricionista", "Clínica Médica", "Endocrinología"],
-            "CISB La Banda": ["Consulta Nutricional", "Clínica Médica"],
-            "Upa N° 5 B° Autonomía": ["Nutricionista", "Control de Peso"]
-        }
-    }
-}
+# --- CACHÉ DE RESPUESTAS ONLINE (proceso, persistida en SQLite) ---
+@st.cache_resource(show_spinner=False)
+def cargar_cache_respuestas():
+    return CacheRespuestas(
+        config.leer("cache_db", str(DIRECTORIO_APP / "cache_respuestas.sqlite3")),
+        capacidad=config.leer("cache_capacidad", 5000),
+        ttl=config.leer("cache_ttl_segundos", 7 * 24 * 3600),
+    )
+
+# --- REGISTRO DE CONSULTAS (se escribe en segundo plano, en lotes) ---
+@st.cache_resource(show_spinner=False)
+def cargar_registro_consultas():
+    registro = RegistroConsultas(
+        config.leer("consultas_dir", str(DIRECTORIO_APP / "registros")),
+        max_bytes=config.leer("consultas_max_bytes", 5 * 1024 * 1024),
+        conservar=config.leer("consultas_conservar", 20),
+    )
+    atexit.register(registro.cerrar)
+    return registro
+
+RUTA_PROMOVIDAS = config.leer("promovidas", str(DIRECTORIO_APP / "promovidas.toml"))
+
+# --- POOL DE LLAMADAS AL MODELO (techo de concurrencia para todas las sesiones) ---
+@st.cache_resource(show_spinner=False)
+def cargar_ejecutor_llm():
+    return EjecutorLLM(
+        max_concurrencia=config.leer("llm_concurrencia", 8),
+        max_cola=config.leer("llm_cola", 64),
+        plazo=config.leer("llm_plazo_segundos", 30.0),
+        reintentos=config.leer("llm_reintentos", 2),
+        transitorios=ERRORES_TRANSITORIOS,
+    )
+
+# Cortacircuitos: si Gemini falla o se pone lento, se deja de esperarlo por un rato
+@st.cache_resource(show_spinner=False)
+def cargar_circuito():
+    return Circuito(
+        ventana=config.leer("circuito_ventana_segundos", 60.0),
+        minimo_llamadas=config.leer("circuito_minimo_llamadas", 5),
+        tasa_errores=config.leer("circuito_tasa_errores", 0.5),
+        latencia_p95=config.leer("circuito_latencia_p95_segundos", 20.0),
+        espera=config.leer("circuito_espera_segundos", 30.0),
+        plazo_sonda=config.leer("circuito_plazo_sonda_segundos", 120.0),
+    )
+
+online_mode_ready = online_mode_ready and cargar_circuito().disponible
+if cliente_gemini.listo and not online_mode_ready:
+    st.info("⚠️ La IA está con problemas en este momento; por ahora respondemos con la información guardada.")
+
+# --- CONTENIDO DE LAS CATEGORÍAS (contenido.toml: preguntas frecuentes, prompts y centros de salud) ---
+@st.cache_resource(show_spinner=False)
+def cargar_fuente_catalogo():
+    cache = cargar_cache_respuestas()
+    umbral = config.leer("semantico_umbral", 0.62)
+    ruta_centros = config.leer("centros", str(DIRECTORIO_APP / "centros.toml"))
+    def construir(ruta):
+        # El índice semántico se siembra con las consultas ya cacheadas (sus respuestas siguen en el cache);
+        # las promovidas por frecuencia que ya se aprobaron se responden además por consulta exacta
+        def sembrar(categoria, version):
+            return [consulta for consulta, _ in cache.entradas(categoria, version)]
+        return Catalogo.desde_archivo(
+            ruta, ruta_centros, sembrar=sembrar, aprobadas=sembrado_promovidas(leer_promovidas(RUTA_PROMOVIDAS)),
+            umbral_semantico=umbral, max_consultas=cache.capacidad,
+        )
+    return FuenteCatalogo(
+        config.leer("contenido", str(DIRECTORIO_APP / "contenido.toml")), construir, extras=[ruta_centros, RUTA_PROMOVIDAS]
+    )
+
+catalogo = cargar_fuente_catalogo().actual()
+
+@st.cache_resource(show_spinner=False)
+def iniciar_promocion():
+    """Cada tanto anota en promovidas.toml las consultas online más pedidas, como candidatas a aprobar."""
+    def promover_ahora():
+        return promover(
+            cargar_registro_consultas().directorio,
+            cargar_cache_respuestas(),
+            cargar_fuente_catalogo().actual().versiones_prompt,
+            RUTA_PROMOVIDAS,
+            minimo=config.leer("promocion_minimo", 3),
+            maximo=config.leer("promocion_maximo", 50),
+        )
+    # Con varios procesos de la app, promueve uno solo (el que toma el bloqueo)
+    return promover_periodicamente(
+        config.leer("promocion_intervalo_segundos", 3600.0), promover_ahora, bloqueo=f"{RUTA_PROMOVIDAS}.lock"
+    )
+
+iniciar_promocion()
 
 # --- LÓGICA DE TURNOS ANÓNIMOS ---
-def generar_codigo_aleatorio():
-    palabras = ["LUNA", "SOL", "RIOJA", "SALTA", "NORTE", "CEIBO", "FLOR", "PAZ"]
-    numero = random.randint(100, 999)
-    return f"{random.choice(palabras)}-{random.choice(palabras)}-{numero}"
+@st.cache_resource(show_spinner=False)
+def cargar_asignador_turnos():
+    return AsignadorTurnos(
+        config.leer("turnos_db", str(DIRECTORIO_APP / "turnos.sqlite3")),
+        vigencia=config.leer("turnos_vigencia_dias", 30) * 24 * 3600,
+    )
+
+CENTROS_CERCANOS = config.leer("turnos_centros_cercanos", 5)
 
 def mostrar_interfaz_de_turnos(categoria_actual):
     st.info("#### 🗓️ Generador de Turno Anónimo")
     
-    centros_de_salud_categoria = st.session_state.contenido_dinamico[categoria_actual]["centros_de_salud"]
+    centros_de_salud_categoria = catalogo[categoria_actual]["centros_de_salud"]
+    directorio = catalogo.directorio
+    especialidades_categoria = list(dict.fromkeys(e for lista in centros_de_salud_categoria.values() for e in lista))
     
-    centro_elegido = st.selectbox("1. Elige un centro de salud:", list(centros_de_salud_categoria.keys()))
+    especialidad_elegida = st.selectbox("1. Elige una especialidad:", especialidades_categoria)
+    zona = st.selectbox("2. ¿Dónde estás? (opcional, para mostrarte los centros más cercanos)", ["Prefiero no decirlo", *directorio.zonas])
+    centros_posibles = list(directorio.centros_con(especialidad_elegida))
+    distancias = {}
+    if zona in directorio.zonas:
+        distancias = dict(directorio.cercanos(*directorio.zonas[zona], n=CENTROS_CERCANOS, especialidad=especialidad_elegida))
+        # Primero los más cercanos; los centros sin ubicación cargada quedan al final
+        centros_posibles = [*distancias, *(c for c in centros_posibles if c not in directorio.coordenadas)]
+    centro_elegido = st.selectbox(
+        "3. Elige un centro de salud:",
+        centros_posibles,
+        format_func=lambda centro: f"{centro} ({distancias[centro]:.1f} km)" if centro in distancias else centro,
+    )
     if centro_elegido:
-        especialidades_disponibles = centros_de_salud_categoria[centro_elegido]
-        especialidad_elegida = st.selectbox("2. Elige una especialidad:", especialidades_disponibles)
         if st.button("Generar mi código anónimo"):
-            codigo = generar_codigo_aleatorio()
-            st.session_state.codigo_generado = {"codigo": codigo, "centro": centro_elegido, "especialidad": especialidad_elegida}
-            st.rerun()
+            try:
+                st.session_state.codigo_generado = cargar_asignador_turnos().emitir(centro_elegido, especialidad_elegida)
+            except (CodigoAgotado, sqlite3.Error):
+                st.error("No pudimos generar el código en este momento. Por favor, intenta de nuevo.")
+            else:
+                st.rerun()
     st.markdown("---")
     if st.button("⬅️ Volver al chat principal"):
         st.session_state.view = 'chat'
@@ -362,7 +391,7 @@ def mostrar_interfaz_de_turnos(categoria_actual):
         **Próximos pasos:**
         1.  Guarda este código (anótalo o sácale una captura).
         2.  Dirígete a **{info['centro']}**.
-        3.  Presenta este código en recepción para tu turno de **{info['especialidad']}**.
+        3.  Presenta este código en recepción para tu turno de **{info['especialidad']}** (válido hasta el {time.strftime('%d/%m/%Y', time.localtime(info['vence']))}).
         *No se te pedirá ningún dato personal hasta que llegues al centro de salud.*
         """, unsafe_allow_html=True)
         st.balloons()
@@ -370,48 +399,221 @@ def mostrar_interfaz_de_turnos(categoria_actual):
 
 
 # --- CEREBRO HÍBRIDO ---
-def obtener_respuesta_hibrida(query, categoria_seleccionada):
-    query_minusculas = query.lower()
-    
-    if "turno" in query_minusculas:
+STREAMING_ACTIVO = config.leer("streaming", True)
+# Errores que indican que el modelo (o un envoltorio suyo) no acepta `stream=True`.
+ERRORES_SIN_STREAM = (NotImplementedError, TypeError)
+
+def _contar_tokens(uso):
+    if uso is None:
+        return
+    metricas.REGISTRO.incrementar("integrasalud_llm_tokens_total", getattr(uso, "prompt_token_count", 0) or 0, sentido="entrada")
+    metricas.REGISTRO.incrementar("integrasalud_llm_tokens_total", getattr(uso, "candidates_token_count", 0) or 0, sentido="salida")
+
+def _enviar(full_prompt, historial, restante, stream=False):
+    if historial:
+        # Sesión de chat efímera: el historial ya viene recortado al presupuesto de tokens
+        return model.start_chat(history=historial).send_message(full_prompt, stream=stream, request_options={"timeout": restante})
+    return model.generate_content(full_prompt, stream=stream, request_options={"timeout": restante})
+
+def _generar_bloqueante(full_prompt, historial=None):
+    def generar(restante):
+        with metricas.medir("integrasalud_llm_segundos", modo="bloqueante"):
+            respuesta = _enviar(full_prompt, historial, restante)
+        _contar_tokens(getattr(respuesta, "usage_metadata", None))
+        return respuesta.text
+    return generar
+
+def _generar_stream(full_prompt, historial=None):
+    def fragmentos(restante):
+        uso = None
+        with metricas.medir("integrasalud_llm_segundos", modo="stream"):
+            for fragmento in _enviar(full_prompt, historial, restante, stream=True):
+                uso = getattr(fragmento, "usage_metadata", None) or uso
+                try:
+                    yield fragmento.text
+                except ValueError:  # fragmento sin texto (p. ej. solo metadatos de seguridad)
+                    continue
+        _contar_tokens(uso)
+    return fragmentos
+
+def consultar_modelo(full_prompt, al_recibir=None, historial=None):
+    """Llama a Gemini a través del pool compartido. Con `al_recibir`, transmite el texto parcial a medida que llega."""
+    ejecutor = cargar_ejecutor_llm()
+    if al_recibir is None or not STREAMING_ACTIVO:
+        return ejecutor.ejecutar(_generar_bloqueante(full_prompt, historial))
+    limite = time.monotonic() + ejecutor.plazo
+    partes = []
+    try:
+        for texto in ejecutor.transmitir(_generar_stream(full_prompt, historial), plazo=ejecutor.plazo):
+            partes.append(texto)
+            al_recibir("".join(partes))
+    except ERRORES_SIN_STREAM:
+        if partes:
+            raise
+        # El modelo no admite streaming: una sola llamada bloqueante con lo que queda del mismo plazo.
+        # Cualquier otro error (clave, cuota, reintentos agotados) se propaga sin repetir la consulta.
+        restante = limite - time.monotonic()
+        if restante <= 0:
+            raise PlazoAgotadoLLM(f"sin respuesta tras {ejecutor.plazo:g} s") from None
+        return ejecutor.ejecutar(_generar_bloqueante(full_prompt, historial), plazo=restante)
+    return "".join(partes)
+
+def consultar_con_circuito(full_prompt, al_recibir=None, historial=None):
+    """`consultar_modelo` detrás del cortacircuitos; con el circuito abierto falla al instante."""
+    circuito = cargar_circuito()
+    if not circuito.permitir():
+        raise CircuitoAbierto("modo online suspendido por errores o demoras recientes")
+    inicio = time.perf_counter()
+    try:
+        respuesta = consultar_modelo(full_prompt, al_recibir, historial)
+    except SaturacionLLM:
+        circuito.descartar()  # el pool propio está lleno: no dice nada de la salud de Gemini
+        raise
+    except Exception:
+        circuito.registrar(False, time.perf_counter() - inicio)
+        raise
+    except BaseException:
+        circuito.descartar()  # Streamlit cortó el rerun desde `al_recibir`: tampoco dice nada de Gemini
+        raise
+    circuito.registrar(True, time.perf_counter() - inicio)
+    return respuesta
+
+@st.cache_resource(show_spinner=False)
+def cargar_vuelos_online():
+    return GrupoVueloUnico("integrasalud_llm_coalescidas")
+
+@st.cache_resource(show_spinner=False)
+def iniciar_metricas():
+    """Medidores de los recursos compartidos y, si se configuró un puerto, el endpoint /metrics."""
+    # Los totales que solo crecen van como contadores (para rate()); el resto, como medidores.
+    fuentes = [
+        ("integrasalud_cache_respuestas", cargar_cache_respuestas().estadisticas, "cache de respuestas del modelo",
+         ("aciertos", "fallos", "desalojos", "expiraciones")),
+        ("integrasalud_llm_pool", cargar_ejecutor_llm().metricas, "pool compartido de llamadas al modelo",
+         ("completadas", "fallidas", "rechazadas", "plazos_agotados", "reintentos")),
+        ("integrasalud_llm_circuito", cargar_circuito().metricas, "circuito de protección del modelo",
+         ("aperturas", "rechazadas")),
+        ("integrasalud_registro_consultas", cargar_registro_consultas().estadisticas, "registro de consultas en disco",
+         ("escritos", "descartados", "rotaciones")),
+    ]
+    for nombre, estadisticas, descripcion, totales in fuentes:
+        metricas.REGISTRO.medidor(f"{nombre}_total", metricas.medidor_desde_dict(estadisticas, claves=totales),
+                                  tipo="counter", ayuda=f"Eventos acumulados del {descripcion}, por serie.")
+        metricas.REGISTRO.medidor(nombre, metricas.medidor_desde_dict(estadisticas, excluir=totales),
+                                  ayuda=f"Estado actual del {descripcion}, por serie.")
+    puerto = config.leer("metricas_puerto", 0)
+    return metricas.iniciar_servidor(puerto) if puerto else None
+
+iniciar_metricas()
+
+def _registrar_correccion(query_normalizada, query_corregida, etapa):
+    """Una respuesta local que solo apareció gracias a la corrección: una llamada online evitada."""
+    metricas.REGISTRO.incrementar("integrasalud_correcciones_online_evitadas_total", etapa=etapa)
+    evitadas = metricas.REGISTRO.contador("integrasalud_correcciones_online_evitadas_total", etapa=etapa)
+    logger.info("Corrección %r -> %r evitó una llamada online (%s, %d en total)", query_normalizada, query_corregida, etapa, evitadas)
+
+def obtener_respuesta_hibrida(query, categoria_seleccionada, al_recibir=None):
+    query_normalizada = normalizar(query)
+    # Los buscadores locales reciben la consulta con los errores de tipeo corregidos
+    query_corregida = catalogo.corrector.corregir(query_normalizada)
+    corregida = query_corregida != query_normalizada
+
+    # Sobre lo que escribió el usuario: corregido, "turbo" pasaría a ser "turno"
+    if "turno" in query_normalizada:
         return None, "turno"
-        
-    preguntas_offline = st.session_state.contenido_dinamico[categoria_seleccionada]["preguntas_frecuentes"]
-    for palabra, respuesta in preguntas_offline.items():
-        if palabra in query_minusculas: 
-            return respuesta, "offline"
+
+    indice_offline = catalogo.indices_faq[categoria_seleccionada]
+    respuesta = indice_offline.buscar(query_corregida)
+    if respuesta is not None:
+        if corregida and indice_offline.buscar(query_normalizada) is None:
+            _registrar_correccion(query_normalizada, query_corregida, "offline")
+        return respuesta, "offline"
+    respuesta = catalogo.respuestas_aprobadas[categoria_seleccionada].get(query_normalizada)
+    if respuesta is not None:
+        return respuesta, "offline"
+
+    system_prompt = catalogo[categoria_seleccionada]["system_prompt"]
+    version = version_prompt(system_prompt)
+    cache = cargar_cache_respuestas()
+    respuesta = cache.obtener(categoria_seleccionada, query_normalizada, version)
+    if respuesta is not None:
+        return respuesta, "cache"
+
+    indice_semantico = catalogo.indices_semanticos[categoria_seleccionada]
+    def del_cache(consulta):
+        return cache.obtener(categoria_seleccionada, consulta, version)
+    respuesta, _ = indice_semantico.buscar(query_corregida, del_cache)
+    if respuesta is not None:
+        if corregida and indice_semantico.buscar(query_normalizada, del_cache)[0] is None:
+            _registrar_correccion(query_normalizada, query_corregida, "semantico")
+        return respuesta, "semantico"
     
     if online_mode_ready and model:
         try:
-            system_prompt = st.session_state.contenido_dinamico[categoria_seleccionada]["system_prompt"]
-            full_prompt = f"{system_prompt} Responde a la siguiente consulta del usuario: {query}"
-            response = model.generate_content(full_prompt)
-            respuesta_online = response.text
-            st.session_state.contenido_dinamico[categoria_seleccionada]["preguntas_frecuentes"][query_minusculas] = respuesta_online
+            full_prompt = construir_prompt(system_prompt, query)
+            memoria = st.session_state.memoria
+            historial = memoria.historial() if memoria and es_seguimiento(query) else []
+            tokens = memoria.registrar_envio(historial, full_prompt)
+            metricas.REGISTRO.observar("integrasalud_llm_prompt_tokens", tokens, cubos=metricas.CUBOS_TOKENS, contexto="si" if historial else "no")
+            if historial:
+                # La respuesta depende de la conversación: se envía con contexto y no se comparte ni se guarda
+                return consultar_con_circuito(full_prompt, al_recibir, historial), "online"
+            def consultar_y_guardar(publicar):
+                respuesta_online = consultar_con_circuito(full_prompt, publicar if al_recibir is not None else None)
+                # El cache la comparte con todas las sesiones por consulta exacta (con TTL y LRU)
+                cache.guardar(categoria_seleccionada, query_normalizada, version, respuesta_online)
+                indice_semantico.agregar(query_normalizada)  # la respuesta se pide al cache al encontrarla
+                return respuesta_online
+            # Consultas idénticas simultáneas de otras sesiones comparten una sola llamada
+            respuesta_online, _ = cargar_vuelos_online().ejecutar(
+                (categoria_seleccionada, query_normalizada, version),
+                consultar_y_guardar,
+                al_recibir=al_recibir,
+                plazo=cargar_ejecutor_llm().plazo,
+            )
             return respuesta_online, "online"
+        except CircuitoAbierto:
+            pass
+        except SaturacionLLM:
+            return "Hay muchas consultas en este momento. Por favor, intenta de nuevo en unos segundos.", "error"
+        except (PlazoAgotadoLLM, TimeoutError):
+            return "La IA está tardando demasiado en responder. Por favor, intenta de nuevo más tarde.", "error"
         except Exception as e: 
+            cliente_gemini.registrar_error(e)
             return f"Hubo un problema al contactar a la IA. Error técnico: {e}", "error"
     
+    if cliente_gemini.listo:
+        # Circuito abierto: las búsquedas locales ya no encontraron nada, así que no se espera al modelo
+        return "La IA no está disponible en este momento y no encontré una respuesta guardada. Por favor, intenta de nuevo en unos minutos.", "degradado"
     return "No encontré una respuesta y el modo online no está activo o falló.", "error"
 
 
-# --- INTERFAZ PRINCIPAL ---
-def get_image_as_base_64(file):
-    try:
-        with open(file, "rb") as f: data = f.read()
-        return base64.b64encode(data).decode()
-    except FileNotFoundError: return None
-
 # --- NAVEGACIÓN Y ESTADO ---
 if 'view' not in st.session_state: st.session_state.view = 'chat'
 if 'categoria' not in st.session_state: st.session_state.categoria = "Salud Sexual"
-if 'historial' not in st.session_state: st.session_state.historial = []
-if 'contenido_dinamico' not in st.session_state: st.session_state.contenido_dinamico = CONTENIDO_CATEGORIAS_BASE
+TURNOS_POR_PAGINA = config.leer("historial_turnos_por_pagina", 10)
+
+def nueva_memoria():
+    return MemoriaConversacion(
+        presupuesto_tokens=config.leer("conversacion_presupuesto_tokens", 1200),
+        turnos_literales=config.leer("conversacion_turnos_literales", 3),
+        tokens_resumen=config.leer("conversacion_tokens_resumen", 300),
+    )
+
+def nuevo_historial():
+    return HistorialChat(
+        max_turnos=config.leer("historial_max_turnos", 100),
+        turnos_sin_comprimir=config.leer("historial_turnos_sin_comprimir", 20),
+    )
+
+if 'historial' not in st.session_state: st.session_state.historial = nuevo_historial()
+if 'turnos_visibles' not in st.session_state: st.session_state.turnos_visibles = TURNOS_POR_PAGINA
+if 'memoria' not in st.session_state: st.session_state.memoria = nueva_memoria()
 
 st.sidebar.title("Secciones")
 categoria_seleccionada = st.sidebar.selectbox(
     "Elige un área de consulta:",
-    list(st.session_state.contenido_dinamico.keys())
+    list(catalogo.keys())
 )
 
 st.sidebar.markdown("---")
@@ -419,26 +621,27 @@ with st.sidebar.expander("Historial de Consultas", expanded=True):
     if not st.session_state.historial:
         st.write("Aún no hay consultas.")
     else:
-        for i, (pregunta, _) in enumerate(st.session_state.historial[-5:]):
+        for pregunta in st.session_state.historial.ultimas_preguntas(5):
             st.info(f"{pregunta[:35]}...")
 
 if categoria_seleccionada != st.session_state.categoria:
     st.session_state.categoria = categoria_seleccionada
     st.session_state.view = 'chat'
-    st.session_state.historial = [] 
+    st.session_state.historial = nuevo_historial()
+    st.session_state.memoria = nueva_memoria()
+    st.session_state.turnos_visibles = TURNOS_POR_PAGINA
     st.rerun()
 
-info_categoria = st.session_state.contenido_dinamico[st.session_state.categoria]
-img_dark_base64 = get_image_as_base_64("logo_dark.png")
-img_light_base64 = get_image_as_base_64("logo_light.png")
+info_categoria = catalogo[st.session_state.categoria]
+encabezado = cargar_encabezado()
 
-if img_dark_base64 and img_light_base64:
+if encabezado:
     st.markdown(
         f"""
         <div class="custom-header">
             <!-- Dos logos: uno para cada tema -->
-            <img class="logo-dark" src="data:image/png;base64,{img_dark_base64}">
-            <img class="logo-light" src="data:image/png;base64,{img_light_base64}">
+            {encabezado["html_dark"]}
+            {encabezado["html_light"]}
             <div>
                 <h2 class="title-text">IntegraSalud SDE</h2>
                 <p class="caption-text">{info_categoria["titulo"]}</p>
@@ -460,12 +663,17 @@ else:
     st.markdown("")
     st.markdown("")
     st.markdown("<p class='welcome-message'>Bienvenido/a a IntegraSalud, un espacio seguro para tus dudas.</p>", unsafe_allow_html=True)
-    # Mostrar el historial de chat como burbujas
-    st.markdown('<div class="chat-container">', unsafe_allow_html=True)
-    for i, (pregunta, respuesta) in enumerate(st.session_state.historial):
-        st.markdown(f'<div class="chat-bubble user-bubble">{pregunta}</div>', unsafe_allow_html=True)
-        st.markdown(f'<div class="chat-bubble assistant-bubble">{respuesta}</div>', unsafe_allow_html=True)
-    st.markdown('</div>', unsafe_allow_html=True)
+    # Mostrar el historial de chat como burbujas (solo los últimos turnos, en un único bloque)
+    historial = st.session_state.historial
+    if len(historial) > st.session_state.turnos_visibles:
+        if st.button(f"Ver más ({len(historial) - st.session_state.turnos_visibles} anteriores)"):
+            st.session_state.turnos_visibles += TURNOS_POR_PAGINA
+            st.rerun()
+    if historial:
+        with metricas.medir("integrasalud_render_segundos", parte="historial"):
+            st.markdown(historial.html(st.session_state.turnos_visibles), unsafe_allow_html=True)
+    # Lugar reservado para la respuesta en curso (se completa mientras llega el stream)
+    burbuja_en_vivo = st.empty()
 
     placeholder = info_categoria["placeholder"]
     
@@ -478,11 +686,21 @@ else:
         submitted = st.form_submit_button("Consultar")
 
     if submitted and user_query:
-        respuesta, metodo = obtener_respuesta_hibrida(user_query, st.session_state.categoria)
+        def mostrar_parcial(texto):
+            burbuja_en_vivo.markdown(html_contenedor([html_turno(user_query, texto, en_curso=True)]), unsafe_allow_html=True)
+        inicio_consulta = time.perf_counter()
+        respuesta, metodo = obtener_respuesta_hibrida(user_query, st.session_state.categoria, al_recibir=mostrar_parcial)
+        segundos_consulta = time.perf_counter() - inicio_consulta
+        metricas.REGISTRO.observar("integrasalud_respuesta_segundos", segundos_consulta, metodo=metodo)
+        cargar_registro_consultas().anotar(st.session_state.categoria, normalizar(user_query), metodo, segundos_consulta)
+        metricas.REGISTRO.incrementar("integrasalud_respuestas_total", metodo=metodo)
+        st.session_state.ultimo_metodo = metodo
         if metodo == "turno":
             st.session_state.view = 'turno'
         else:
-            st.session_state.historial.append((user_query, respuesta))
+            st.session_state.historial.agregar(user_query, respuesta)
+            if metodo not in ("error", "degradado"):
+                st.session_state.memoria.agregar(user_query, respuesta)
         st.rerun()
 
 # --- PIE DE PÁGINA ---
@@ -492,5 +710,4 @@ st.markdown("---")
 st.markdown("<p class='footer-text'>Copyright © 2025</p>", unsafe_allow_html=True)
 st.markdown("<p class='footer-text'>Desarrollado con ❤️ por Santino, Virginia, Candela y Milagros</p>", unsafe_allow_html=True)
 
-
-
+metricas.REGISTRO.observar("integrasalud_rerun_segundos", time.perf_counter() - inicio_rerun)
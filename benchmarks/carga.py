@@ -0,0 +1,260 @@
+"""Benchmark de carga y latencia de app.py sin red (Gemini simulado).
+
+Simula varias sesiones con `streamlit.testing.v1.AppTest`: cada sesión elige
+una categoría, hace consultas (claves FAQ, paráfrasis y preguntas nuevas que
+van al modelo) y de vez en cuando recorre el flujo de turnos. Cada sesión
+corre en su propio hilo, así el pool compartido, el vuelo único y el
+circuito reciben carga concurrente; con --procesos además se reparten entre
+varios procesos que comparten la caché SQLite, como varias réplicas de la
+app en un host.
+
+Uso:
+    python benchmarks/carga.py --sesiones 20 --consultas 10 --latencia 0.2 --fallos 0.05
+"""
+import argparse
+import atexit
+import json
+import os
+import random
+import shutil
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+RAIZ = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(RAIZ))
+
+CONSULTAS = {
+    "Salud Sexual": ["qué son las ITS", "cómo me cuido en las relaciones", "métodos para no quedar embarazada",
+                     "qué es el consentimiento", "dónde consigo preservativos gratis"],
+    "Salud Mental": ["tengo ansiedad", "me siento nervioso todo el tiempo", "estoy estresado por el trabajo",
+                     "no tengo ganas de hacer nada", "qué es la depresión"],
+    "Nutrición": ["cuánta agua tengo que tomar por día", "qué comer para ganar músculo",
+                  "las harinas engordan", "qué son las proteínas"],
+}
+TEMAS_NUEVOS = ["dengue", "vacunas", "presión alta", "insomnio", "celiaquía", "VIH", "colesterol", "embarazo"]
+
+
+def _rss_kb():
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") // 1024
+    except OSError:
+        import resource
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+
+def _medir_payload():
+    """Instrumenta AppTest para registrar, por hilo, los bytes de ForwardMsg del último rerun."""
+    from streamlit.testing.v1 import local_script_runner
+
+    original = local_script_runner.parse_tree_from_messages
+    ultimos = threading.local()
+
+    def parsear(mensajes):
+        ultimos.bytes = sum(m.ByteSize() for m in mensajes)
+        return original(mensajes)
+
+    local_script_runner.parse_tree_from_messages = parsear
+    return ultimos
+
+
+def _fijar_secretos(secretos):
+    """Fija st.secrets para todo el proceso.
+
+    AppTest reemplaza y restaura st.secrets en cada run si se le pasan
+    secretos; con varias sesiones en hilos, una restauración pisaría los
+    secretos de otra que todavía corre. Fijándolos una vez, AppTest no los toca.
+    """
+    import streamlit as st
+    from streamlit.runtime.secrets import Secrets
+
+    fijos = Secrets()
+    fijos._secrets = dict(secretos)
+    st.secrets = fijos
+
+
+def _compartir_runtime():
+    """Adapta AppTest, pensado para una sesión a la vez, a sesiones en varios hilos.
+
+    - Cada AppTest.run() instala un Runtime simulado y al terminar lo borra
+      (Runtime._instance = None); entre hilos, ese borrado le llega a los
+      scripts de otras sesiones. Mientras no haya uno instalado se usa el
+      último visto.
+    - Cada run compila app.py con un ScriptCache nuevo, y ast.parse en varios
+      hilos a la vez falla en CPython 3.11. Se comparte uno solo, como hace el
+      Runtime real entre sesiones.
+    """
+    from streamlit.runtime import Runtime
+    from streamlit.runtime.scriptrunner.script_cache import ScriptCache
+    from streamlit.testing.v1 import app_test, local_script_runner
+
+    compartido = ScriptCache()
+    compartido.get_bytecode(str(RAIZ / "app.py"))  # se compila antes de lanzar los hilos
+    app_test.ScriptCache = local_script_runner.ScriptCache = lambda: compartido
+
+    ultimo = [None]
+
+    def instance(cls):
+        if cls._instance is not None:
+            ultimo[0] = cls._instance
+        elif ultimo[0] is None:
+            raise RuntimeError("Runtime hasn't been created!")
+        return cls._instance or ultimo[0]
+
+    Runtime.instance = classmethod(instance)
+    Runtime.exists = classmethod(lambda cls: cls._instance is not None or ultimo[0] is not None)
+
+
+def _boton(at, prefijo):
+    for boton in at.button:
+        if boton.label.startswith(prefijo):
+            return boton
+    raise LookupError(prefijo)
+
+
+def correr_sesiones(n_sesiones, n_consultas, latencia, tasa_fallos, prob_nueva, prob_turno, semilla, cache_db):
+    os.environ["INTEGRASALUD_CACHE_DB"] = cache_db
+    os.environ["INTEGRASALUD_TURNOS_DB"] = str(Path(cache_db).with_name("turnos.sqlite3"))
+    os.environ["INTEGRASALUD_CONSULTAS_DIR"] = str(Path(cache_db).with_name("registros"))
+    os.environ["INTEGRASALUD_PROMOVIDAS"] = str(Path(cache_db).with_name("promovidas.toml"))
+    os.environ.setdefault("INTEGRASALUD_GEMINI_PRECALENTAR", "0")
+    from integrasalud import modelo_simulado
+    modelo = modelo_simulado.instalar(latencia=latencia, tasa_fallos=tasa_fallos, semilla=semilla)
+    from streamlit.testing.v1 import AppTest
+
+    payload = _medir_payload()
+    _fijar_secretos({"GOOGLE_API_KEY": "simulada"})
+    _compartir_runtime()
+    tiempos, bytes_por_rerun, metodos, errores = [], [], {}, []
+
+    def sesion(azar):
+        def rerun(at):
+            inicio = time.perf_counter()
+            at.run()
+            tiempos.append(time.perf_counter() - inicio)
+            bytes_por_rerun.append(payload.bytes)
+            errores.append(len(at.exception))
+
+        at = AppTest.from_file(str(RAIZ / "app.py"), default_timeout=60)
+        rerun(at)
+        categoria = azar.choice(list(CONSULTAS))
+        at.sidebar.selectbox[0].select(categoria)
+        rerun(at)
+        for _ in range(n_consultas):
+            sorteo = azar.random()
+            if sorteo < prob_turno:
+                consulta = "quiero sacar un turno"
+            elif sorteo < prob_turno + prob_nueva:
+                consulta = f"qué sabés sobre {azar.choice(TEMAS_NUEVOS)} {azar.randint(1, 40)}"
+            else:
+                consulta = azar.choice(CONSULTAS[categoria])
+            at.text_input[0].input(consulta)
+            _boton(at, "Consultar").click()
+            rerun(at)
+            metodo = at.session_state["ultimo_metodo"]
+            with bloqueo:
+                metodos[metodo] = metodos.get(metodo, 0) + 1
+            if metodo == "turno":
+                _boton(at, "Generar mi código").click()
+                rerun(at)
+                _boton(at, "⬅️ Volver").click()
+                rerun(at)
+
+    def correr(i):
+        try:
+            sesion(random.Random(f"{semilla}-{i}"))
+        except Exception:
+            errores.append(1)
+            raise
+
+    bloqueo = threading.Lock()
+    rss_inicial = _rss_kb()
+    # Cada sesión en su hilo, como los hilos de script de Streamlit: el pool,
+    # el vuelo único y el circuito ven consultas concurrentes.
+    hilos = [threading.Thread(target=correr, args=(i,), name=f"sesion-{i}") for i in range(n_sesiones)]
+    for hilo in hilos:
+        hilo.start()
+    for hilo in hilos:
+        hilo.join()
+
+    return {
+        "tiempos": tiempos,
+        "bytes": bytes_por_rerun,
+        "metodos": metodos,
+        "errores": sum(errores),
+        "llamadas_modelo": modelo.llamadas,
+        "rss_kb_por_sesion": (_rss_kb() - rss_inicial) / max(1, n_sesiones),
+    }
+
+
+def _percentil(valores, p):
+    ordenados = sorted(valores)
+    return ordenados[min(len(ordenados) - 1, int(p * len(ordenados)))] if ordenados else 0.0
+
+
+def resumir(resultados):
+    tiempos = [t for r in resultados for t in r["tiempos"]]
+    bytes_ = [b for r in resultados for b in r["bytes"]]
+    metodos = {}
+    for r in resultados:
+        for metodo, n in r["metodos"].items():
+            metodos[metodo] = metodos.get(metodo, 0) + n
+    consultas = sum(n for m, n in metodos.items() if m != "turno") or 1
+    return {
+        "reruns": len(tiempos),
+        "rerun_ms_p50": 1000 * _percentil(tiempos, 0.50),
+        "rerun_ms_p95": 1000 * _percentil(tiempos, 0.95),
+        "rerun_ms_p99": 1000 * _percentil(tiempos, 0.99),
+        "payload_kb_promedio": sum(bytes_) / max(1, len(bytes_)) / 1024,
+        "payload_kb_max": max(bytes_, default=0) / 1024,
+        "metodos": metodos,
+        "proporcion_offline": sum(metodos.get(m, 0) for m in ("offline", "cache", "semantico")) / consultas,
+        "proporcion_online": metodos.get("online", 0) / consultas,
+        "llamadas_modelo": sum(r["llamadas_modelo"] for r in resultados),
+        "rss_kb_por_sesion": sum(r["rss_kb_por_sesion"] for r in resultados) / len(resultados),
+        "excepciones": sum(r["errores"] for r in resultados),
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sesiones", type=int, default=10)
+    parser.add_argument("--consultas", type=int, default=5, help="consultas por sesión")
+    parser.add_argument("--procesos", type=int, default=1)
+    parser.add_argument("--latencia", type=float, default=0.1, help="segundos por llamada simulada")
+    parser.add_argument("--fallos", type=float, default=0.0, help="tasa de fallos del modelo simulado")
+    parser.add_argument("--nuevas", type=float, default=0.3, help="probabilidad de una pregunta fuera de las FAQ")
+    parser.add_argument("--turnos", type=float, default=0.1, help="probabilidad de pedir un turno")
+    parser.add_argument("--semilla", type=int, default=0)
+    parser.add_argument("--json", action="store_true", help="imprime el resumen como JSON")
+    args = parser.parse_args(argv)
+
+    # Se borra al salir, después de que la app vacíe su registro de consultas (atexit corre en orden inverso)
+    tmp = tempfile.mkdtemp()
+    atexit.register(shutil.rmtree, tmp, True)
+    cache_db = str(Path(tmp) / "cache.sqlite3")
+    por_proceso = [args.sesiones // args.procesos + (i < args.sesiones % args.procesos) for i in range(args.procesos)]
+    tareas = [
+        (n, args.consultas, args.latencia, args.fallos, args.nuevas, args.turnos, args.semilla + i, cache_db)
+        for i, n in enumerate(por_proceso) if n
+    ]
+    if len(tareas) == 1:
+        resultados = [correr_sesiones(*tareas[0])]
+    else:
+        with ProcessPoolExecutor(len(tareas)) as pool:
+            resultados = list(pool.map(correr_sesiones, *zip(*tareas)))
+
+    resumen = resumir(resultados)
+    if args.json:
+        print(json.dumps(resumen, indent=2, ensure_ascii=False))
+        return
+    for clave, valor in resumen.items():
+        print(f"{clave:>22}: {valor:.2f}" if isinstance(valor, float) else f"{clave:>22}: {valor}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,53 @@
+"""Throughput del asignador de códigos de turno (emisión y validación concurrentes).
+
+Uso:
+    python benchmarks/turnos.py --hilos 8 --codigos 20000
+"""
+import argparse
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from integrasalud.turnos import AsignadorTurnos  # noqa: E402
+
+CENTROS = [("Upa N° 2 B° Cáceres (Capital)", "Ginecología"), ("CISB La Banda", "Clínica Médica"),
+           ("Hospital Psiquiátrico 'Diego Alcorta'", "Psicología")]
+
+
+def medir(hilos, n, funcion, argumentos):
+    inicio = time.perf_counter()
+    with ThreadPoolExecutor(hilos) as pool:
+        resultados = list(pool.map(funcion, argumentos, chunksize=max(1, n // (hilos * 8))))
+    return resultados, time.perf_counter() - inicio
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--hilos", type=int, default=8)
+    parser.add_argument("--codigos", type=int, default=20000)
+    args = parser.parse_args(argv)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        asignador = AsignadorTurnos(Path(tmp) / "turnos.sqlite3")
+        emitidos, segundos = medir(
+            args.hilos, args.codigos, lambda i: asignador.emitir(*CENTROS[i % len(CENTROS)]), range(args.codigos)
+        )
+        codigos = [turno["codigo"] for turno in emitidos]
+        assert len(set(codigos)) == len(codigos), "códigos duplicados"
+        print(f"emisión:    {args.codigos / segundos:>10.0f} códigos/s  ({args.hilos} hilos, {asignador.colisiones} colisiones)")
+
+        validos, segundos = medir(args.hilos, len(codigos), asignador.validar, codigos)
+        assert all(validos), "código emitido que no valida"
+        print(f"validación: {len(codigos) / segundos:>10.0f} consultas/s")
+
+        inexistentes = [f"NUBE-PAZ-{i % 10000:04d}" for i in range(len(codigos))]
+        _, segundos = medir(args.hilos, len(inexistentes), asignador.validar, inexistentes)
+        print(f"rechazo:    {len(inexistentes) / segundos:>10.0f} consultas/s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1 @@
+"""Servicios de soporte de IntegraSalud SDE (activos, búsqueda offline, caché, etc.)."""
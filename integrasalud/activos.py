@@ -0,0 +1,98 @@
+"""Pipeline de imágenes del encabezado y el favicon.
+
+Los PNG originales pesan varios MB; incrustarlos en base64 en cada rerun
+enviaba ~6 MB por interacción. Aquí se generan una sola vez variantes WebP
+reducidas al tamaño real en que se muestran y se devuelven como data URIs
+pequeños, listos para cachear a nivel de proceso.
+"""
+import base64
+import io
+import logging
+from pathlib import Path
+
+from PIL import Image
+
+logger = logging.getLogger(__name__)
+
+# Anchos (en px CSS) de `.custom-header img`: escritorio y el breakpoint de celulares.
+ANCHO_ESCRITORIO = 400
+ANCHO_CELULAR = 300
+BREAKPOINT_CELULAR = 640
+# Se codifica al doble de ancho para pantallas de alta densidad.
+ESCALA_PIXELES = 2
+CALIDAD_WEBP = 82
+LADO_FAVICON = 64
+
+
+def _largo_base64(n_bytes):
+    return 4 * ((n_bytes + 2) // 3)
+
+
+def _a_webp(imagen, ancho):
+    alto = round(imagen.height * ancho / imagen.width)
+    reducida = imagen.resize((ancho, alto), Image.LANCZOS) if ancho < imagen.width else imagen
+    buffer = io.BytesIO()
+    reducida.save(buffer, format="WEBP", quality=CALIDAD_WEBP, method=4)
+    return buffer.getvalue()
+
+
+def _data_uri(datos, mime):
+    return f"data:{mime};base64,{base64.b64encode(datos).decode()}"
+
+
+def preparar_logo(ruta):
+    """Devuelve {"escritorio", "celular", "bytes_original", "bytes_variantes"} o None si falta el archivo."""
+    ruta = Path(ruta)
+    try:
+        with Image.open(ruta) as imagen:
+            imagen.load()
+    except FileNotFoundError:
+        return None
+    escritorio = _a_webp(imagen, ANCHO_ESCRITORIO * ESCALA_PIXELES)
+    celular = _a_webp(imagen, ANCHO_CELULAR * ESCALA_PIXELES)
+    return {
+        "escritorio": _data_uri(escritorio, "image/webp"),
+        "celular": _data_uri(celular, "image/webp"),
+        "bytes_original": _largo_base64(ruta.stat().st_size),
+        "bytes_variantes": _largo_base64(len(escritorio)) + _largo_base64(len(celular)),
+    }
+
+
+def preparar_favicon(ruta):
+    """Favicon reducido a LADO_FAVICON px; si no existe se devuelve la ruta tal cual."""
+    try:
+        with Image.open(ruta) as imagen:
+            imagen.load()
+    except FileNotFoundError:
+        return str(ruta)
+    imagen.thumbnail((LADO_FAVICON, LADO_FAVICON), Image.LANCZOS)
+    return imagen
+
+
+def html_logo(logo, clase):
+    return (
+        f'<picture class="{clase}">'
+        f'<source media="(max-width: {BREAKPOINT_CELULAR}px)" srcset="{logo["celular"]}">'
+        f'<img class="{clase}" src="{logo["escritorio"]}">'
+        f"</picture>"
+    )
+
+
+def preparar_encabezado(directorio):
+    """Codifica ambos logos una vez. Devuelve None si falta alguno."""
+    directorio = Path(directorio)
+    logo_dark = preparar_logo(directorio / "logo_dark.png")
+    logo_light = preparar_logo(directorio / "logo_light.png")
+    if not logo_dark or not logo_light:
+        return None
+    antes = logo_dark["bytes_original"] + logo_light["bytes_original"]
+    despues = logo_dark["bytes_variantes"] + logo_light["bytes_variantes"]
+    logger.info(
+        "Logos del encabezado: %d KB -> %d KB por rerun (ahorro de %d KB)",
+        antes // 1024, despues // 1024, (antes - despues) // 1024,
+    )
+    return {
+        "html_dark": html_logo(logo_dark, "logo-dark"),
+        "html_light": html_logo(logo_light, "logo-light"),
+        "bytes_ahorrados_por_rerun": antes - despues,
+    }
@@ -0,0 +1,130 @@
+"""Índice de palabras clave de las preguntas frecuentes (autómata Aho-Corasick).
+
+Reemplaza el recorrido lineal de `preguntas_frecuentes.items()`: el costo de una
+búsqueda depende del largo de la consulta y no de cuántas entradas se acumulen.
+
+Los autómatas armados no se modifican nunca. Las claves nuevas van a un
+autómata chico de recientes que se rearma entero en cada alta; cuando crece
+demasiado se funde con el principal en uno nuevo que reemplaza al anterior.
+Las búsquedas leen los autómatas vigentes sin tomar ningún lock, así que un
+alta (o una fusión) nunca hace esperar a las demás sesiones.
+"""
+import threading
+
+from integrasalud.texto import normalizar
+
+# Tamaño a partir del cual el autómata de recientes se funde con el principal.
+MAX_RECIENTES = 256
+
+
+class _Automata:
+    """Aho-Corasick inmutable sobre un conjunto de claves ya normalizadas."""
+
+    __slots__ = ("hijos", "fallo", "mejor")
+
+    def __init__(self, claves):
+        """`claves` es {clave: orden}."""
+        self.hijos = [{}]
+        terminal = [None]
+        for clave in claves:
+            nodo = 0
+            for caracter in clave:
+                siguiente = self.hijos[nodo].get(caracter)
+                if siguiente is None:
+                    siguiente = len(self.hijos)
+                    self.hijos.append({})
+                    terminal.append(None)
+                    self.hijos[nodo][caracter] = siguiente
+                nodo = siguiente
+            terminal[nodo] = clave
+        self.fallo = [0] * len(self.hijos)
+        self.mejor = [None] * len(self.hijos)  # (largo, orden, clave) más larga que termina en el nodo o en su cadena de fallos
+        # Recorrido BFS: cada nodo hereda del nodo de fallo la mejor clave si no tiene una propia.
+        cola = list(self.hijos[0].values())
+        indice = 0
+        while indice < len(cola):
+            nodo = cola[indice]
+            indice += 1
+            clave = terminal[nodo]
+            if clave is not None:
+                self.mejor[nodo] = (len(clave), claves[clave], clave)
+            else:
+                self.mejor[nodo] = self.mejor[self.fallo[nodo]]
+            for caracter, hijo in self.hijos[nodo].items():
+                fallo = self.fallo[nodo]
+                while fallo and caracter not in self.hijos[fallo]:
+                    fallo = self.fallo[fallo]
+                self.fallo[hijo] = self.hijos[fallo].get(caracter, 0)
+                cola.append(hijo)
+
+    def recorrer(self, texto, elegido=None):
+        """Mejor (prioridad, clave) de `texto`, partiendo de `elegido`."""
+        hijos, fallo, mejor = self.hijos, self.fallo, self.mejor
+        nodo = 0
+        for posicion, caracter in enumerate(texto):
+            while nodo and caracter not in hijos[nodo]:
+                nodo = fallo[nodo]
+            nodo = hijos[nodo].get(caracter, 0)
+            candidato = mejor[nodo]
+            if candidato:
+                largo, orden, clave = candidato
+                prioridad = (-largo, posicion - largo, orden)
+                if elegido is None or prioridad < elegido[0]:
+                    elegido = (prioridad, clave)
+        return elegido
+
+
+class IndiceFAQ:
+    """Encuentra la clave más específica contenida en una consulta.
+
+    Prioridad determinista: la clave más larga; ante empate, la que empieza
+    antes en la consulta; luego la que se agregó primero.
+    """
+
+    def __init__(self, preguntas=None, max_recientes=MAX_RECIENTES):
+        self.max_recientes = max_recientes
+        self._lock = threading.Lock()  # solo serializa las altas
+        self._respuestas = {}  # clave normalizada -> (orden, respuesta)
+        self._recientes = {}  # claves que todavía no están en el principal -> orden
+        for clave, respuesta in (preguntas or {}).items():
+            clave = normalizar(clave)
+            if clave:
+                self._respuestas[clave] = (self._respuestas.get(clave, (len(self._respuestas),))[0], respuesta)
+        self._automatas = (self._armar(self._respuestas), _Automata({}))
+        self.fusiones = 0
+
+    def __len__(self):
+        return len(self._respuestas)
+
+    def agregar(self, clave, respuesta):
+        """Agrega (o reemplaza) una entrada; es visible para la próxima búsqueda."""
+        clave = normalizar(clave)
+        if not clave:
+            return
+        with self._lock:
+            anterior = self._respuestas.get(clave)
+            if anterior is not None:
+                self._respuestas[clave] = (anterior[0], respuesta)
+                return
+            self._respuestas[clave] = (len(self._respuestas), respuesta)
+            principal, _ = self._automatas
+            self._recientes[clave] = len(self._respuestas) - 1
+            if len(self._recientes) > self.max_recientes:
+                principal = self._armar(self._respuestas)
+                self._recientes = {}
+                self.fusiones += 1
+            # Se reemplaza la tupla completa: una búsqueda en curso sigue con el par anterior.
+            self._automatas = (principal, _Automata(self._recientes))
+
+    def buscar(self, query):
+        """Devuelve la respuesta de la clave de mayor prioridad o None."""
+        texto = normalizar(query)
+        principal, recientes = self._automatas
+        elegido = recientes.recorrer(texto, principal.recorrer(texto))
+        if elegido is None:
+            return None
+        return self._respuestas[elegido[1]][1]
+
+    @staticmethod
+    def _armar(respuestas):
+        return _Automata({clave: orden for clave, (orden, _) in list(respuestas.items())})
@@ -0,0 +1,145 @@
+"""Caché de respuestas online compartida por todas las sesiones del proceso.
+
+Clave: (categoría, consulta normalizada, versión del system prompt). Una capa
+LRU en memoria delante de un archivo SQLite (modo WAL) que sobrevive a los
+reinicios y puede compartirse entre varios procesos del mismo host.
+"""
+import hashlib
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+from integrasalud.texto import normalizar
+
+_ESQUEMA = """
+CREATE TABLE IF NOT EXISTS respuestas (
+    categoria TEXT NOT NULL,
+    consulta TEXT NOT NULL,
+    version TEXT NOT NULL,
+    respuesta TEXT NOT NULL,
+    creado REAL NOT NULL,
+    usado REAL NOT NULL,
+    PRIMARY KEY (categoria, consulta, version)
+);
+CREATE INDEX IF NOT EXISTS respuestas_usado ON respuestas (usado);
+"""
+
+
+def version_prompt(system_prompt):
+    """Huella corta del system prompt: al editarlo, las respuestas viejas dejan de servirse."""
+    return hashlib.sha256(normalizar(system_prompt).encode()).hexdigest()[:12]
+
+
+class CacheRespuestas:
+    def __init__(self, ruta=":memory:", capacidad=5000, ttl=7 * 24 * 3600, reloj=time.time):
+        self.capacidad = capacidad
+        self.ttl = ttl
+        self._reloj = reloj
+        self._lock = threading.Lock()
+        self._memoria = OrderedDict()  # clave -> (respuesta, creado)
+        self._usos_pendientes = {}  # aciertos en memoria aún no reflejados en `usado`
+        self._conexion = sqlite3.connect(str(ruta), check_same_thread=False, timeout=5)
+        self._conexion.execute("PRAGMA journal_mode=WAL")
+        self._conexion.execute("PRAGMA synchronous=NORMAL")
+        self._conexion.executescript(_ESQUEMA)
+        self.aciertos = 0
+        self.fallos = 0
+        self.desalojos = 0
+        self.expiraciones = 0
+
+    @staticmethod
+    def clave(categoria, query, version):
+        return (categoria, normalizar(query), version)
+
+    def obtener(self, categoria, query, version):
+        clave = self.clave(categoria, query, version)
+        ahora = self._reloj()
+        with self._lock:
+            entrada = self._memoria.get(clave)
+            if entrada is None:
+                fila = self._conexion.execute(
+                    "SELECT respuesta, creado FROM respuestas WHERE categoria=? AND consulta=? AND version=?",
+                    clave,
+                ).fetchone()
+                if fila is not None:
+                    entrada = (fila[0], fila[1])
+                    self._recordar(clave, entrada)
+            if entrada is not None and ahora - entrada[1] > self.ttl:
+                self._olvidar(clave)
+                self.expiraciones += 1
+                entrada = None
+            if entrada is None:
+                self.fallos += 1
+                return None
+            self._memoria.move_to_end(clave)
+            self._usos_pendientes[clave] = ahora
+            self.aciertos += 1
+            return entrada[0]
+
+    def guardar(self, categoria, query, version, respuesta):
+        clave = self.clave(categoria, query, version)
+        ahora = self._reloj()
+        with self._lock:
+            self._conexion.execute(
+                "INSERT OR REPLACE INTO respuestas VALUES (?, ?, ?, ?, ?, ?)",
+                (*clave, respuesta, ahora, ahora),
+            )
+            self._recordar(clave, (respuesta, ahora))
+            self._recortar_disco()
+            self._conexion.commit()
+
+    def entradas(self, categoria, version):
+        """Lista (consulta, respuesta) vigentes de una categoría; sirve para precargar índices."""
+        limite = self._reloj() - self.ttl
+        with self._lock:
+            return self._conexion.execute(
+                "SELECT consulta, respuesta FROM respuestas"
+                " WHERE categoria=? AND version=? AND creado >= ? ORDER BY usado",
+                (categoria, version, limite),
+            ).fetchall()
+
+    def estadisticas(self):
+        with self._lock:
+            en_disco = self._conexion.execute("SELECT COUNT(*) FROM respuestas").fetchone()[0]
+            return {
+                "aciertos": self.aciertos,
+                "fallos": self.fallos,
+                "desalojos": self.desalojos,
+                "expiraciones": self.expiraciones,
+                "en_memoria": len(self._memoria),
+                "en_disco": en_disco,
+            }
+
+    def _recordar(self, clave, entrada):
+        self._memoria[clave] = entrada
+        self._memoria.move_to_end(clave)
+        while len(self._memoria) > self.capacidad:
+            self._memoria.popitem(last=False)
+
+    def _olvidar(self, clave):
+        self._memoria.pop(clave, None)
+        self._usos_pendientes.pop(clave, None)
+        self._conexion.execute(
+            "DELETE FROM respuestas WHERE categoria=? AND consulta=? AND version=?", clave
+        )
+        self._conexion.commit()
+
+    def _recortar_disco(self):
+        # Desaloja por LRU (columna `usado`) lo que exceda la capacidad.
+        self._conexion.executemany(
+            "UPDATE respuestas SET usado=? WHERE categoria=? AND consulta=? AND version=?",
+            [(usado, *clave) for clave, usado in self._usos_pendientes.items()],
+        )
+        self._usos_pendientes.clear()
+        sobrantes = self._conexion.execute(
+            "SELECT categoria, consulta, version FROM respuestas ORDER BY usado LIMIT max(0, (SELECT COUNT(*) FROM respuestas) - ?)",
+            (self.capacidad,),
+        ).fetchall()
+        for clave in sobrantes:
+            self._memoria.pop(tuple(clave), None)
+            self._usos_pendientes.pop(tuple(clave), None)
+            self._conexion.execute(
+                "DELETE FROM respuestas WHERE categoria=? AND consulta=? AND version=?", clave
+            )
+        self.desalojos += len(sobrantes)
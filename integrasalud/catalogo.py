@@ -0,0 +1,162 @@
+"""Catálogo de contenido inmutable, leído de `contenido.toml`, con recarga en caliente.
+
+El archivo se parsea una vez por proceso a estructuras congeladas
+(`MappingProxyType`/tuplas) junto con sus índices de búsqueda ya armados.
+Las sesiones nunca modifican el contenido. El índice de palabras clave
+solo tiene las preguntas frecuentes curadas y las respuestas aprobadas se
+buscan por consulta exacta; las respuestas online viven en el cache de
+respuestas (con su TTL y su LRU), que es lo que comparten las sesiones. El
+índice semántico, además de las frases curadas, se siembra con las consultas
+de ese cache y crece con las respuestas nuevas. La recarga por cambio de
+mtime arma el catálogo nuevo en un hilo aparte mientras los reruns en curso
+siguen usando el anterior.
+"""
+import logging
+import os
+import threading
+import time
+from types import MappingProxyType
+
+from integrasalud.buscador import IndiceFAQ
+from integrasalud.cache_respuestas import version_prompt
+from integrasalud.centros import DirectorioCentros
+from integrasalud.correccion import Corrector
+from integrasalud.semantico import IndiceSemantico
+from integrasalud.texto import normalizar
+
+try:
+    import tomllib
+
+    def leer_toml(ruta):
+        with open(ruta, "rb") as archivo:
+            return tomllib.load(archivo)
+except ModuleNotFoundError:  # Python < 3.11: `toml` viene con streamlit
+    import toml
+
+    def leer_toml(ruta):
+        return toml.load(ruta)
+
+logger = logging.getLogger(__name__)
+
+
+def congelar(valor):
+    if isinstance(valor, dict):
+        return MappingProxyType({clave: congelar(v) for clave, v in valor.items()})
+    if isinstance(valor, list):
+        return tuple(congelar(v) for v in valor)
+    return valor
+
+
+class Catalogo:
+    """Categorías congeladas más sus índices offline y semánticos precompilados.
+
+    `sembrar(categoria, version)` devuelve consultas extra para el índice
+    semántico, típicamente las ya cacheadas para esa versión del prompt; el
+    índice guarda solo la consulta (hasta `max_consultas`) y la respuesta se
+    pide al cache al encontrarla. `aprobadas(categoria, version)` devuelve pares revisados
+    a mano, que se responden por consulta exacta (`respuestas_aprobadas`) y
+    también entran al índice semántico.
+    `ubicaciones` es el contenido de `centros.toml` (tablas `centros` y `zonas`).
+    """
+
+    def __init__(self, contenido, sembrar=None, aprobadas=None, umbral_semantico=0.62, max_consultas=5000,
+                 ubicaciones=None):
+        self.categorias = congelar(contenido)
+        ubicaciones = ubicaciones or {}
+        self.directorio = DirectorioCentros(self.categorias, ubicaciones.get("centros"), ubicaciones.get("zonas"))
+        self.corrector = Corrector.desde_categorias(self.categorias)
+        self.versiones_prompt = {}
+        self.indices_faq = {}
+        self.indices_semanticos = {}
+        self.respuestas_aprobadas = {}
+        for categoria, datos in self.categorias.items():
+            version = version_prompt(datos["system_prompt"])
+            extra = list(sembrar(categoria, version)) if sembrar else []
+            revisadas = {normalizar(consulta): respuesta
+                         for consulta, respuesta in (aprobadas(categoria, version) if aprobadas else ())}
+            indice_faq = IndiceFAQ(datos["preguntas_frecuentes"])
+            indice_semantico = IndiceSemantico(umbral=umbral_semantico, max_consultas=max_consultas)
+            frases = datos.get("frases_similares", {})
+            for clave, respuesta in datos["preguntas_frecuentes"].items():
+                indice_semantico.agregar(clave, respuesta)
+                for frase in frases.get(clave, ()):
+                    indice_semantico.agregar(frase, respuesta)
+            for consulta in extra:
+                indice_semantico.agregar(consulta)
+            for consulta, respuesta in revisadas.items():
+                indice_semantico.agregar(consulta, respuesta)
+            self.versiones_prompt[categoria] = version
+            self.respuestas_aprobadas[categoria] = MappingProxyType(revisadas)
+            self.indices_faq[categoria] = indice_faq
+            self.indices_semanticos[categoria] = indice_semantico
+
+    @classmethod
+    def desde_archivo(cls, ruta, ruta_ubicaciones=None, **kwargs):
+        ubicaciones = leer_toml(ruta_ubicaciones) if ruta_ubicaciones and os.path.exists(ruta_ubicaciones) else None
+        return cls(leer_toml(ruta), ubicaciones=ubicaciones, **kwargs)
+
+    def __getitem__(self, categoria):
+        return self.categorias[categoria]
+
+    def __iter__(self):
+        return iter(self.categorias)
+
+    def keys(self):
+        return self.categorias.keys()
+
+    def items(self):
+        return self.categorias.items()
+
+
+class FuenteCatalogo:
+    """Mantiene el catálogo vigente y lo recarga cuando cambia el mtime del archivo
+    (o de alguno de los archivos `extras` de los que también depende)."""
+
+    def __init__(self, ruta, construir=Catalogo.desde_archivo, intervalo=2.0, extras=()):
+        self.ruta = str(ruta)
+        self._vigilados = (self.ruta, *map(str, extras))
+        self._construir = construir
+        self.intervalo = intervalo
+        self._lock = threading.Lock()
+        self._mtime = self._mtimes()
+        self._catalogo = construir(self.ruta)
+        self._proxima_revision = time.monotonic() + intervalo
+        self._recargando = False
+        self.recargas = 0
+
+    def actual(self):
+        """Catálogo vigente. Como mucho una vez cada `intervalo` revisa el archivo,
+        y si cambió dispara la recarga en segundo plano sin esperar."""
+        ahora = time.monotonic()
+        if ahora >= self._proxima_revision:
+            with self._lock:
+                if ahora >= self._proxima_revision and not self._recargando:
+                    self._proxima_revision = ahora + self.intervalo
+                    mtime = self._mtimes()
+                    if mtime != self._mtime:
+                        self._recargando = True
+                        threading.Thread(target=self._recargar, args=(mtime,), name="catalogo", daemon=True).start()
+        return self._catalogo
+
+    def _mtimes(self):
+        mtimes = []
+        for ruta in self._vigilados:
+            try:
+                mtimes.append(os.stat(ruta).st_mtime_ns)
+            except OSError:
+                mtimes.append(None)
+        return tuple(mtimes)
+
+    def _recargar(self, mtime):
+        try:
+            catalogo = self._construir(self.ruta)
+        except Exception:
+            logger.exception("No se pudo recargar %s; se mantiene el catálogo anterior", self.ruta)
+        else:
+            self._catalogo = catalogo
+            self.recargas += 1
+            logger.info("Catálogo recargado desde %s", self.ruta)
+        finally:
+            with self._lock:
+                self._mtime = mtime
+                self._recargando = False
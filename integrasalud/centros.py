@@ -0,0 +1,106 @@
+"""Directorio unificado de centros de salud.
+
+Reúne los `centros_de_salud` de todas las categorías (un mismo centro puede
+aparecer en varias con especialidades distintas), con un índice invertido
+especialidad -> centros y una grilla geográfica para buscar los N centros
+más cercanos que ofrecen una especialidad.
+"""
+import heapq
+import math
+from types import MappingProxyType
+
+from integrasalud.texto import normalizar
+
+RADIO_TIERRA_KM = 6371.0
+# Lado de cada celda de la grilla, en grados (~5,5 km de latitud).
+CELDA_GRADOS = 0.05
+
+
+def distancia_km(lat1, lon1, lat2, lon2):
+    """Distancia haversine."""
+    p1, p2 = math.radians(lat1), math.radians(lat2)
+    dp, dl = p2 - p1, math.radians(lon2 - lon1)
+    a = math.sin(dp / 2) ** 2 + math.cos(p1) * math.cos(p2) * math.sin(dl / 2) ** 2
+    return 2 * RADIO_TIERRA_KM * math.asin(math.sqrt(a))
+
+
+def _celda(lat, lon):
+    return (math.floor(lat / CELDA_GRADOS), math.floor(lon / CELDA_GRADOS))
+
+
+def _anillo(fila, columna, radio):
+    """Celdas a distancia de Chebyshev exactamente `radio`."""
+    if radio == 0:
+        yield (fila, columna)
+        return
+    for c in range(columna - radio, columna + radio + 1):
+        yield (fila - radio, c)
+        yield (fila + radio, c)
+    for f in range(fila - radio + 1, fila + radio):
+        yield (f, columna - radio)
+        yield (f, columna + radio)
+
+
+class DirectorioCentros:
+    def __init__(self, categorias, ubicaciones=None, zonas=None):
+        ubicaciones = ubicaciones or {}
+        especialidades = {}
+        for datos in categorias.values():
+            for centro, lista in datos.get("centros_de_salud", {}).items():
+                propias = especialidades.setdefault(centro, [])
+                propias.extend(e for e in lista if e not in propias)
+        self.especialidades = MappingProxyType({c: tuple(e) for c, e in especialidades.items()})
+        self.coordenadas = MappingProxyType({
+            centro: (float(u["lat"]), float(u["lon"]))
+            for centro, u in ubicaciones.items() if centro in especialidades
+        })
+        self.zonas = MappingProxyType({
+            zona: (float(u["lat"]), float(u["lon"])) for zona, u in (zonas or {}).items()
+        })
+        indice = {}
+        for centro, lista in self.especialidades.items():
+            for especialidad in lista:
+                indice.setdefault(normalizar(especialidad), []).append(centro)
+        self._por_especialidad = {clave: tuple(centros) for clave, centros in indice.items()}
+        self._grilla = {}
+        for centro, (lat, lon) in self.coordenadas.items():
+            self._grilla.setdefault(_celda(lat, lon), []).append(centro)
+        filas = [f for f, _ in self._grilla] or [0]
+        columnas = [c for _, c in self._grilla] or [0]
+        self._limites = (min(filas), max(filas), min(columnas), max(columnas))
+
+    def __len__(self):
+        return len(self.especialidades)
+
+    def centros_con(self, especialidad):
+        """Centros que ofrecen la especialidad (comparación sin tildes ni mayúsculas)."""
+        return self._por_especialidad.get(normalizar(especialidad), ())
+
+    def cercanos(self, lat, lon, n=5, especialidad=None):
+        """Los `n` centros más cercanos como [(centro, km)], opcionalmente filtrados por especialidad.
+
+        Recorre la grilla en anillos crecientes desde la celda del punto y corta
+        cuando el anillo siguiente ya no puede mejorar el n-ésimo resultado.
+        Los centros sin coordenadas quedan fuera.
+        """
+        permitidos = None if especialidad is None else set(self.centros_con(especialidad))
+        if permitidos is not None and not permitidos:
+            return []
+        fila, columna = _celda(lat, lon)
+        km_por_celda = CELDA_GRADOS * math.pi / 180 * RADIO_TIERRA_KM * max(0.1, math.cos(math.radians(lat)))
+        mejores = []  # heap de (-km, centro)
+        f_min, f_max, c_min, c_max = self._limites
+        radio_max = max(abs(fila - f_min), abs(fila - f_max), abs(columna - c_min), abs(columna - c_max))
+        for radio in range(radio_max + 1):
+            if len(mejores) == n and (radio - 1) * km_por_celda > -mejores[0][0]:
+                break
+            for celda in _anillo(fila, columna, radio):
+                for centro in self._grilla.get(celda, ()):
+                    if permitidos is not None and centro not in permitidos:
+                        continue
+                    km = distancia_km(lat, lon, *self.coordenadas[centro])
+                    if len(mejores) < n:
+                        heapq.heappush(mejores, (-km, centro))
+                    elif km < -mejores[0][0]:
+                        heapq.heapreplace(mejores, (-km, centro))
+        return [(centro, -km) for km, centro in sorted(mejores, reverse=True)]
@@ -0,0 +1,126 @@
+"""Cortacircuitos para las llamadas al modelo.
+
+Lleva una ventana móvil de resultados (éxito y duración) de las llamadas
+recientes. Si la tasa de errores o el p95 de latencia superan su umbral, el
+circuito se abre y las consultas se rechazan al instante en lugar de esperar
+el plazo completo. Pasado `espera`, se deja pasar una sonda por vez
+(semiabierto): si responde bien y rápido el circuito se cierra, si no vuelve
+a abrirse. Una sonda que nunca informa su resultado (la sesión se cortó en
+el medio) deja de ocupar su lugar pasado `plazo_sonda`.
+"""
+import threading
+import time
+from collections import deque
+
+from integrasalud.ejecutor import percentil
+
+CERRADO = "cerrado"
+ABIERTO = "abierto"
+SEMIABIERTO = "semiabierto"
+
+
+class CircuitoAbierto(Exception):
+    """El circuito está abierto: la consulta no se envía al modelo."""
+
+
+class Circuito:
+    def __init__(self, ventana=60.0, minimo_llamadas=5, tasa_errores=0.5, latencia_p95=15.0,
+                 espera=30.0, sondas=1, plazo_sonda=120.0, reloj=time.monotonic):
+        self.ventana = ventana
+        self.minimo_llamadas = minimo_llamadas
+        self.tasa_errores = tasa_errores
+        self.latencia_p95 = latencia_p95
+        self.espera = espera
+        self.sondas = sondas
+        self.plazo_sonda = plazo_sonda
+        self._reloj = reloj
+        self._lock = threading.Lock()
+        self._muestras = deque()  # (instante, exito, segundos)
+        self._abierto_desde = 0.0
+        self._sondas_en_curso = 0
+        self._ultima_sonda = 0.0
+        self.estado = CERRADO
+        self.aperturas = 0
+        self.rechazadas = 0
+
+    @property
+    def disponible(self):
+        """False mientras el circuito está abierto y todavía no toca sondear."""
+        return self.estado != ABIERTO or self._reloj() - self._abierto_desde >= self.espera
+
+    def permitir(self):
+        """True si la llamada puede salir; en semiabierto ocupa un lugar de sonda."""
+        with self._lock:
+            if self.estado == CERRADO:
+                return True
+            if self.estado == ABIERTO:
+                if self._reloj() - self._abierto_desde < self.espera:
+                    self.rechazadas += 1
+                    return False
+                self.estado = SEMIABIERTO
+                self._sondas_en_curso = 0
+            ahora = self._reloj()
+            if self._sondas_en_curso and ahora - self._ultima_sonda >= self.plazo_sonda:
+                self._sondas_en_curso = 0  # sondas perdidas: nunca llamaron a registrar() ni a descartar()
+            if self._sondas_en_curso < self.sondas:
+                self._sondas_en_curso += 1
+                self._ultima_sonda = ahora
+                return True
+            self.rechazadas += 1
+            return False
+
+    def registrar(self, exito, segundos):
+        """Anota el resultado de una llamada que `permitir()` dejó pasar."""
+        with self._lock:
+            ahora = self._reloj()
+            if self.estado == SEMIABIERTO:
+                self._sondas_en_curso = max(0, self._sondas_en_curso - 1)
+                if exito and segundos < self.latencia_p95:
+                    self.estado = CERRADO
+                    self._muestras.clear()
+                else:
+                    self._abrir(ahora)
+                return
+            if self.estado == ABIERTO:
+                return  # llamada que empezó antes de la apertura
+            self._muestras.append((ahora, exito, segundos))
+            while self._muestras and ahora - self._muestras[0][0] > self.ventana:
+                self._muestras.popleft()
+            if len(self._muestras) < self.minimo_llamadas:
+                return
+            errores, p95 = self._errores_y_p95()
+            if errores >= self.tasa_errores or p95 >= self.latencia_p95:
+                self._abrir(ahora)
+
+    def descartar(self):
+        """Libera el lugar de una llamada que no llegó al modelo (p. ej. el pool estaba lleno)."""
+        with self._lock:
+            if self.estado == SEMIABIERTO:
+                self._sondas_en_curso = max(0, self._sondas_en_curso - 1)
+
+    def metricas(self):
+        with self._lock:
+            errores, p95 = self._errores_y_p95()
+            return {
+                "abierto": int(self.estado == ABIERTO),
+                "semiabierto": int(self.estado == SEMIABIERTO),
+                "llamadas_en_ventana": len(self._muestras),
+                "tasa_errores": errores,
+                "latencia_p50": percentil([s for _, _, s in self._muestras], 0.50),
+                "latencia_p95": p95,
+                "aperturas": self.aperturas,
+                "rechazadas": self.rechazadas,
+            }
+
+    def _errores_y_p95(self):
+        if not self._muestras:
+            return 0.0, 0.0
+        errores = sum(not exito for _, exito, _ in self._muestras) / len(self._muestras)
+        return errores, percentil([s for _, _, s in self._muestras], 0.95)
+
+    def _abrir(self, ahora):
+        self.estado = ABIERTO
+        self._abierto_desde = ahora
+        self._sondas_en_curso = 0
+        self._muestras.clear()
+        self.aperturas += 1
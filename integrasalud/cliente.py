@@ -0,0 +1,88 @@
+"""Cliente de Gemini de vida de proceso, con precalentamiento y estado de salud."""
+import logging
+import threading
+
+import google.generativeai as genai
+from google.api_core import exceptions as errores_google
+
+from integrasalud import config
+
+logger = logging.getLogger(__name__)
+
+MODELO_POR_DEFECTO = "gemini-2.0-flash"
+# Errores que vale la pena reintentar (cuota, servicio caído, red).
+ERRORES_TRANSITORIOS = (
+    errores_google.ResourceExhausted,
+    errores_google.ServiceUnavailable,
+    errores_google.InternalServerError,
+    errores_google.DeadlineExceeded,
+    ConnectionError,
+)
+_PARAMETROS = (("temperature", float), ("top_p", float), ("top_k", int), ("max_output_tokens", int))
+
+
+def construir_prompt(system_prompt, query):
+    """Prompt de una consulta sin contexto; lo comparten la app y el precalentamiento del cache."""
+    return f"{system_prompt} Responde a la siguiente consulta del usuario: {query}"
+
+
+def parametros_desde_config():
+    """Parámetros de generación definidos por INTEGRASALUD_GEMINI_<PARAMETRO>; el resto queda en el valor del SDK."""
+    parametros = {}
+    for nombre, tipo in _PARAMETROS:
+        valor = config.leer(f"gemini_{nombre}", None)
+        if valor is not None:
+            parametros[nombre] = tipo(valor)
+    return parametros
+
+
+def es_error_de_clave(error):
+    if isinstance(error, (errores_google.PermissionDenied, errores_google.Unauthenticated)):
+        return True
+    return isinstance(error, errores_google.InvalidArgument) and "api key" in str(error).lower()
+
+
+class ClienteGemini:
+    """Estados: "sin_clave", "listo" o "error" (clave inválida u otro fallo de configuración)."""
+
+    def __init__(self, api_key, nombre_modelo=MODELO_POR_DEFECTO, parametros=None):
+        self.nombre_modelo = nombre_modelo
+        self.parametros = dict(parametros or {})
+        self.modelo = None
+        self.error = None
+        self._lock = threading.Lock()
+        if not api_key:
+            self.estado = "sin_clave"
+            return
+        try:
+            genai.configure(api_key=api_key)
+            self.modelo = genai.GenerativeModel(nombre_modelo, generation_config=self.parametros or None)
+            self.estado = "listo"
+        except Exception as e:
+            self.estado = "error"
+            self.error = e
+
+    @property
+    def listo(self):
+        return self.estado == "listo" and self.modelo is not None
+
+    def calentar(self, timeout=10.0):
+        """Llamada mínima para abrir la conexión y validar la clave una sola vez."""
+        if not self.listo:
+            return
+        try:
+            self.modelo.generate_content(
+                "ping", generation_config={"max_output_tokens": 1}, request_options={"timeout": timeout}
+            )
+        except Exception as e:
+            self.registrar_error(e)
+            if self.listo:
+                logger.warning("Falló el precalentamiento de %s: %s", self.nombre_modelo, e)
+
+    def registrar_error(self, error):
+        """Un error de credenciales deja el cliente fuera de servicio; los demás son pasajeros."""
+        if es_error_de_clave(error):
+            with self._lock:
+                self.estado = "error"
+                self.error = error
+            logger.error("Gemini rechazó la API key: %s", error)
@@ -0,0 +1,14 @@
+"""Parámetros ajustables por variables de entorno (`INTEGRASALUD_<NOMBRE>`)."""
+import os
+
+
+def leer(nombre, defecto):
+    """Lee INTEGRASALUD_<NOMBRE> convirtiéndolo al tipo de `defecto`."""
+    valor = os.environ.get(f"INTEGRASALUD_{nombre.upper()}")
+    if valor is None:
+        return defecto
+    if isinstance(defecto, bool):
+        return valor.strip().lower() in ("1", "true", "si", "sí", "yes", "on")
+    if defecto is None:
+        return valor
+    return type(defecto)(valor)
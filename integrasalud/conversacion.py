@@ -0,0 +1,97 @@
+"""Memoria de conversación por sesión con presupuesto de tokens.
+
+Los últimos turnos se envían literales; los más viejos se condensan en un
+resumen extractivo local (primera oración de cada respuesta) que se
+actualiza de a un turno cuando sale de la ventana literal. El historial
+armado nunca supera el presupuesto, así que el costo por consulta no crece
+con el largo de la conversación.
+"""
+import re
+from collections import deque
+
+from integrasalud.texto import normalizar, tokenizar
+
+# Aproximación habitual para español con los tokenizadores de Gemini.
+CARACTERES_POR_TOKEN = 4
+
+_ORACION = re.compile(r"(?<=[.!?])\s+")
+_MARKDOWN = re.compile(r"[*#_`>]+")
+_CONECTORES = ("y ", "pero ", "entonces ", "o sea", "ademas ", "tambien ")
+_ANAFORAS = frozenset("eso esto esa ese esas esos ello aquello ahi alli".split())
+
+
+def estimar_tokens(texto):
+    return max(1, len(texto) // CARACTERES_POR_TOKEN) if texto else 0
+
+
+def es_seguimiento(query):
+    """True si la consulta parece depender de lo anterior ("¿y eso es grave?")."""
+    normalizada = normalizar(query).lstrip("¿¡ ")
+    if normalizada.startswith(_CONECTORES):
+        return True
+    palabras = set(re.findall(r"\w+", normalizada))
+    return bool(palabras & _ANAFORAS) or not tokenizar(normalizada)
+
+
+def _primera_oracion(texto, max_caracteres=160):
+    limpio = " ".join(_MARKDOWN.sub("", texto).split())
+    oracion = _ORACION.split(limpio, maxsplit=1)[0]
+    return oracion if len(oracion) <= max_caracteres else oracion[:max_caracteres].rstrip() + "…"
+
+
+class MemoriaConversacion:
+    def __init__(self, presupuesto_tokens=1200, turnos_literales=3, tokens_resumen=300):
+        self.presupuesto_tokens = presupuesto_tokens
+        self.turnos_literales = turnos_literales
+        self.tokens_resumen = tokens_resumen
+        self._literales = deque()
+        self._resumen = deque()  # líneas del resumen, la más vieja primero
+        self._tokens_resumen = 0
+        self.ultimo_envio_tokens = 0
+
+    def __len__(self):
+        return len(self._literales) + len(self._resumen)
+
+    def agregar(self, pregunta, respuesta):
+        self._literales.append((pregunta, respuesta))
+        while len(self._literales) > self.turnos_literales:
+            self._resumir(*self._literales.popleft())
+
+    def resumen(self):
+        return "\n".join(self._resumen)
+
+    def historial(self):
+        """Historial para `start_chat(history=...)`: resumen + turnos literales dentro del presupuesto."""
+        disponible = self.presupuesto_tokens
+        turnos = []
+        # Los turnos literales más recientes tienen prioridad sobre los más viejos y sobre el resumen.
+        for pregunta, respuesta in reversed(self._literales):
+            costo = estimar_tokens(pregunta) + estimar_tokens(respuesta)
+            if costo > disponible:
+                break
+            turnos.append((pregunta, respuesta))
+            disponible -= costo
+        historial = []
+        resumen = self.resumen()
+        if resumen and estimar_tokens(resumen) <= disponible:
+            historial += [
+                {"role": "user", "parts": [f"Resumen de la conversación hasta ahora:\n{resumen}"]},
+                {"role": "model", "parts": ["Entendido, lo tengo en cuenta."]},
+            ]
+        for pregunta, respuesta in reversed(turnos):
+            historial += [{"role": "user", "parts": [pregunta]}, {"role": "model", "parts": [respuesta]}]
+        return historial
+
+    def registrar_envio(self, historial, prompt):
+        """Anota (y devuelve) los tokens estimados que se envían en una consulta."""
+        self.ultimo_envio_tokens = estimar_tokens(prompt) + sum(
+            estimar_tokens(parte) for mensaje in historial for parte in mensaje["parts"]
+        )
+        return self.ultimo_envio_tokens
+
+    def _resumir(self, pregunta, respuesta):
+        linea = f"- Preguntó: {_primera_oracion(pregunta, 80)} → {_primera_oracion(respuesta)}"
+        self._resumen.append(linea)
+        self._tokens_resumen += estimar_tokens(linea)
+        while self._tokens_resumen > self.tokens_resumen and len(self._resumen) > 1:
+            self._tokens_resumen -= estimar_tokens(self._resumen.popleft())
@@ -0,0 +1,150 @@
+"""Corrección de errores de tipeo antes de los buscadores offline (estilo SymSpell).
+
+Al construir el corrector se indexan todas las variantes de cada palabra del
+vocabulario con hasta `distancia_max` letras borradas. Corregir una palabra es
+generar sus propios borrados y buscarlos en ese diccionario, así que el costo
+depende del largo de la palabra y no del tamaño del vocabulario. Los
+candidatos se confirman con la distancia de Damerau-Levenshtein.
+"""
+import re
+from types import MappingProxyType
+
+from integrasalud.texto import PALABRAS_VACIAS, normalizar
+
+# Vocabulario de salud (ya normalizado: sin tildes): las únicas palabras, junto con las
+# de contenido.toml, hacia las que se corrige.
+VOCABULARIO_SALUD = frozenset("""
+abuso acne adiccion adolescente agua alcohol alergia alimentacion alimentos amigo ampolla analisis
+angustia animo ansiedad anticonceptivo anticonceptivos antibiotico apetito arroz azucar azucares
+bajar bebe beber bulimia anorexia cabeza calcio calorias cancer cansancio carne carbohidratos celiaco
+centro cerebro chequeo ciclo cigarrillo cita clinica colesterol comer comida condon consentimiento
+consulta contagio contagiar contagioso control controles cuerpo cuidar cuidarse debilidad
+deshidratacion depresion desayuno diabetes diagnostico diarrea dieta dolor dormir droga drogas duelo
+embarazada embarazo emergencia emocional emociones energia enfermedad enfermedades engordar
+ejercicio estres estresado familia fatiga fiebre fibra frutas ginecologo ginecologa gonorrea grasas
+gripe harinas hepatitis herpes hidratacion hierro hipertension hongos hormonas hospital implante
+infeccion infecciones insomnio intimas lacteos legumbres llorar mareo medico medica menstruacion
+metodo metodos minerales miedo musculo nervios nervioso nutricion nutricionista obesidad pandemia
+panico pareja pastilla pastillas peso picazon prevencion preocupacion preservativo preservativos
+proteina proteinas psicologo psicologa psiquiatra regla relaciones salud sangre sed sexo sexual
+sexualidad sida sifilis sintoma sintomas sobrepeso soledad sueno suicidio tabaco terapia test
+testeo tiroides tratamiento tristeza triste turno urgencia vacuna vacunas vegano vegetariano
+verduras vih violencia vitaminas vomito vph
+""".split())
+
+# Palabras comunes de las consultas: se reconocen (no se corrigen) pero nunca son destino
+# de una corrección, igual que las palabras vacías.
+PALABRAS_COMUNES = frozenset("""
+ayuda ayudar bien cuando cuanta cuantas cuanto cuantos cuidado cura curar dia dias donde duele duelen
+grave hacer hago mal mejor mucho necesito noche normal pasa pasar poco porque puedo quiero sentir
+siento sirve tiene tienen tomar tomo usar video videos
+""".split())
+
+_PALABRA = re.compile(r"\w+")
+
+
+def _borrados(palabra, distancia_max):
+    """Todas las variantes de `palabra` con hasta `distancia_max` letras menos (incluida ella misma)."""
+    resultado = {palabra}
+    frontera = {palabra}
+    for _ in range(distancia_max):
+        frontera = {p[:i] + p[i + 1:] for p in frontera if len(p) > 1 for i in range(len(p))}
+        resultado |= frontera
+    return resultado
+
+
+def distancia(a, b, limite):
+    """Damerau-Levenshtein (transposiciones adyacentes); devuelve limite + 1 si lo supera."""
+    if abs(len(a) - len(b)) > limite:
+        return limite + 1
+    anterior2 = None
+    anterior = list(range(len(b) + 1))
+    for i in range(1, len(a) + 1):
+        actual = [i] + [0] * len(b)
+        for j in range(1, len(b) + 1):
+            costo = a[i - 1] != b[j - 1]
+            actual[j] = min(anterior[j] + 1, actual[j - 1] + 1, anterior[j - 1] + costo)
+            if i > 1 and j > 1 and a[i - 1] == b[j - 2] and a[i - 2] == b[j - 1]:
+                actual[j] = min(actual[j], anterior2[j - 2] + 1)
+        if min(actual) > limite:
+            return limite + 1
+        anterior2, anterior = anterior, actual
+    return anterior[-1]
+
+
+class Corrector:
+    """Corrige palabra por palabra contra un vocabulario fijo.
+
+    `vocabulario` es {palabra: peso}; ante candidatos a igual distancia gana el
+    de mayor peso (las palabras clave de las FAQ pesan más que el vocabulario
+    general). Solo se corrige hacia palabras con peso >= `peso_minimo`: las
+    comunes pesan 0, así "casa" o "pasta" no terminan en "pasa". Las palabras
+    cortas o conocidas no se tocan.
+    """
+
+    def __init__(self, vocabulario, distancia_max=2, largo_minimo=6, peso_minimo=1):
+        self.distancia_max = distancia_max
+        self.largo_minimo = largo_minimo
+        self.peso_minimo = peso_minimo
+        self.vocabulario = MappingProxyType(dict(vocabulario))
+        borrados = {}
+        for palabra, peso in self.vocabulario.items():
+            if peso < peso_minimo:
+                continue
+            for variante in _borrados(palabra, self._tolerancia(palabra)):
+                borrados.setdefault(variante, []).append(palabra)
+        self._borrados = MappingProxyType({variante: tuple(palabras) for variante, palabras in borrados.items()})
+
+    def __len__(self):
+        return len(self.vocabulario)
+
+    @classmethod
+    def desde_categorias(cls, categorias, **kwargs):
+        """Vocabulario de salud + palabras de las claves y frases de cada categoría (+ comunes y vacías, con peso 0)."""
+        comunes = PALABRAS_COMUNES | PALABRAS_VACIAS
+        vocabulario = dict.fromkeys(comunes, 0)
+        vocabulario.update(dict.fromkeys(VOCABULARIO_SALUD, 1))
+        for datos in categorias.values():
+            frases = [*datos.get("preguntas_frecuentes", {})]
+            frases += [frase for lista in datos.get("frases_similares", {}).values() for frase in lista]
+            for frase in frases:
+                for palabra in _PALABRA.findall(normalizar(frase)):
+                    if palabra not in comunes:
+                        vocabulario[palabra] = vocabulario.get(palabra, 0) + 1
+            for clave in datos.get("preguntas_frecuentes", {}):
+                for palabra in _PALABRA.findall(normalizar(clave)):
+                    if palabra not in comunes:
+                        vocabulario[palabra] += 10
+        return cls(vocabulario, **kwargs)
+
+    def _tolerancia(self, palabra):
+        # Las palabras cortas quedan como están: a una letra de distancia hay
+        # demasiadas palabras comunes ("cielo"/"ciclo", "carta"/"carne").
+        if len(palabra) < self.largo_minimo:
+            return 0
+        return 1 if len(palabra) < 9 else self.distancia_max
+
+    def corregir_palabra(self, palabra):
+        if palabra in self.vocabulario or palabra.isdigit():
+            return palabra
+        tolerancia = self._tolerancia(palabra)
+        if not tolerancia:
+            return palabra
+        mejor, mejor_clave = palabra, None
+        vistos = set()
+        for variante in _borrados(palabra, tolerancia):
+            for candidato in self._borrados.get(variante, ()):
+                if candidato in vistos:
+                    continue
+                vistos.add(candidato)
+                d = distancia(palabra, candidato, tolerancia)
+                if d > tolerancia:
+                    continue
+                clave = (d, -self.vocabulario[candidato], candidato)
+                if mejor_clave is None or clave < mejor_clave:
+                    mejor, mejor_clave = candidato, clave
+        return mejor
+
+    def corregir(self, query):
+        """Texto normalizado con cada palabra desconocida reemplazada por la más cercana del vocabulario."""
+        return _PALABRA.sub(lambda m: self.corregir_palabra(m.group()), normalizar(query))
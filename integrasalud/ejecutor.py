@@ -0,0 +1,175 @@
+"""Pool acotado compartido para todas las llamadas al modelo de lenguaje.
+
+Pone un techo de concurrencia a las llamadas salientes de todas las sesiones,
+rechaza rápido cuando la cola está llena, aplica un plazo por consulta y
+reintenta los errores transitorios con espera exponencial con jitter.
+"""
+import queue
+import random
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as _TimeoutFuturo
+
+_FIN = object()
+
+
+class SaturacionLLM(Exception):
+    """La cola del pool está llena; la consulta se rechaza sin esperar."""
+
+
+class PlazoAgotadoLLM(Exception):
+    """La consulta no terminó dentro de su plazo."""
+
+
+def percentil(valores, p):
+    if not valores:
+        return 0.0
+    ordenados = sorted(valores)
+    return ordenados[min(len(ordenados) - 1, int(p * len(ordenados)))]
+
+
+class EjecutorLLM:
+    def __init__(self, max_concurrencia=8, max_cola=64, plazo=30.0, reintentos=2,
+                 espera_base=0.5, espera_max=8.0, transitorios=(ConnectionError, TimeoutError)):
+        self.max_concurrencia = max_concurrencia
+        self.max_cola = max_cola
+        self.plazo = plazo
+        self.reintentos = reintentos
+        self.espera_base = espera_base
+        self.espera_max = espera_max
+        self.transitorios = tuple(transitorios)
+        self._pool = ThreadPoolExecutor(max_workers=max_concurrencia, thread_name_prefix="llm")
+        self._cupos = threading.BoundedSemaphore(max_concurrencia + max_cola)
+        self._lock = threading.Lock()
+        self._esperas = deque(maxlen=1024)
+        self.en_cola = 0
+        self.en_curso = 0
+        self.completadas = 0
+        self.fallidas = 0
+        self.rechazadas = 0
+        self.plazos_agotados = 0
+        self.reintentos_hechos = 0
+
+    def ejecutar(self, funcion, plazo=None):
+        """Corre `funcion(segundos_restantes)` en el pool y devuelve su resultado."""
+        limite = time.monotonic() + (plazo or self.plazo)
+        futuro = self._enviar(lambda: self._con_reintentos(funcion, limite), limite)
+        try:
+            return futuro.result(timeout=max(0.0, limite - time.monotonic()))
+        except _TimeoutFuturo:
+            self._contar("plazos_agotados")
+            raise PlazoAgotadoLLM(f"sin respuesta tras {plazo or self.plazo:g} s") from None
+
+    def transmitir(self, funcion, plazo=None):
+        """Como `ejecutar`, pero `funcion` devuelve un iterable cuyos elementos se
+        entregan al hilo llamador a medida que llegan. Solo se reintenta si el
+        error ocurre antes del primer elemento."""
+        limite = time.monotonic() + (plazo or self.plazo)
+        salida = queue.Queue()
+
+        def producir(restante):
+            entregados = 0
+            try:
+                for elemento in funcion(restante):
+                    salida.put(elemento)
+                    entregados += 1
+            except self.transitorios as error:
+                if entregados:
+                    raise _ErrorTrasEntregar(error) from error
+                raise
+
+        def tarea():
+            try:
+                self._con_reintentos(producir, limite)
+                salida.put(_FIN)
+            except _ErrorTrasEntregar as error:
+                salida.put(error.original)
+                raise
+            except BaseException as error:
+                salida.put(error)
+                raise
+
+        self._enviar(tarea, limite)
+        while True:
+            try:
+                elemento = salida.get(timeout=max(0.0, limite - time.monotonic()))
+            except queue.Empty:
+                self._contar("plazos_agotados")
+                raise PlazoAgotadoLLM(f"sin respuesta tras {plazo or self.plazo:g} s") from None
+            if elemento is _FIN:
+                return
+            if isinstance(elemento, BaseException):
+                raise elemento
+            yield elemento
+
+    def metricas(self):
+        with self._lock:
+            esperas = list(self._esperas)
+            return {
+                "en_cola": self.en_cola,
+                "en_curso": self.en_curso,
+                "completadas": self.completadas,
+                "fallidas": self.fallidas,
+                "rechazadas": self.rechazadas,
+                "plazos_agotados": self.plazos_agotados,
+                "reintentos": self.reintentos_hechos,
+                "espera_p50": percentil(esperas, 0.50),
+                "espera_p95": percentil(esperas, 0.95),
+                "espera_max": max(esperas, default=0.0),
+            }
+
+    def _contar(self, nombre, delta=1):
+        with self._lock:
+            setattr(self, nombre, getattr(self, nombre) + delta)
+
+    def _enviar(self, tarea, limite):
+        if not self._cupos.acquire(blocking=False):
+            self._contar("rechazadas")
+            raise SaturacionLLM("demasiadas consultas en curso")
+        encolado = time.monotonic()
+        self._contar("en_cola")
+
+        def envoltura():
+            with self._lock:
+                self.en_cola -= 1
+                self.en_curso += 1
+                self._esperas.append(time.monotonic() - encolado)
+            try:
+                if time.monotonic() >= limite:
+                    # El llamador ya se rindió mientras esperaba en la cola.
+                    raise PlazoAgotadoLLM("plazo vencido en la cola")
+                resultado = tarea()
+            except BaseException:
+                self._contar("fallidas")
+                raise
+            else:
+                self._contar("completadas")
+                return resultado
+            finally:
+                self._contar("en_curso", -1)
+                self._cupos.release()
+
+        return self._pool.submit(envoltura)
+
+    def _con_reintentos(self, funcion, limite):
+        intento = 0
+        while True:
+            restante = limite - time.monotonic()
+            try:
+                return funcion(restante)
+            except self.transitorios:
+                espera = random.uniform(0, min(self.espera_max, self.espera_base * 2 ** intento))
+                if intento >= self.reintentos or time.monotonic() + espera >= limite:
+                    raise
+                intento += 1
+                self._contar("reintentos_hechos")
+                time.sleep(espera)
+
+
+class _ErrorTrasEntregar(Exception):
+    """Error transitorio después de entregar datos: no debe reintentarse."""
+
+    def __init__(self, original):
+        super().__init__(str(original))
+        self.original = original
@@ -0,0 +1,71 @@
+"""Historial de chat por sesión: HTML pre-armado por intercambio y memoria acotada.
+
+Cada intercambio se convierte a HTML una sola vez al agregarse. Los más
+recientes se guardan tal cual; los viejos se comprimen con zlib y, pasado
+el tope, se descartan.
+"""
+import html
+import re
+import textwrap
+import zlib
+
+_NEGRITA = re.compile(r"\*\*(.+?)\*\*")
+_CURSIVA = re.compile(r"(?<!\*)\*(?!\s)(.+?)(?<!\s)\*(?!\*)")
+
+
+def texto_a_html(texto):
+    """Markdown mínimo (negrita, cursiva, saltos de línea) sin líneas en blanco,
+    para que varias burbujas convivan dentro de un mismo bloque HTML."""
+    lineas = textwrap.dedent(texto).strip().splitlines()
+    seguro = "<br>".join(html.escape(linea.strip()) for linea in lineas)
+    seguro = _NEGRITA.sub(r"<strong>\1</strong>", seguro)
+    return _CURSIVA.sub(r"<em>\1</em>", seguro)
+
+
+def html_turno(pregunta, respuesta, en_curso=False):
+    cursor = "▌" if en_curso else ""
+    return (
+        f'<div class="chat-bubble user-bubble">{html.escape(pregunta)}</div>'
+        f'<div class="chat-bubble assistant-bubble">{texto_a_html(respuesta)}{cursor}</div>'
+    )
+
+
+def html_contenedor(bloques):
+    return f'<div class="chat-container">{"".join(bloques)}</div>'
+
+
+class HistorialChat:
+    def __init__(self, max_turnos=100, turnos_sin_comprimir=20):
+        self.max_turnos = max_turnos
+        self.turnos_sin_comprimir = turnos_sin_comprimir
+        self._preguntas = []
+        self._bloques = []  # str (recientes) o bytes zlib (viejos)
+        self.descartados = 0
+
+    def __len__(self):
+        return len(self._bloques)
+
+    def __bool__(self):
+        return bool(self._bloques)
+
+    def agregar(self, pregunta, respuesta):
+        self._preguntas.append(pregunta)
+        self._bloques.append(html_turno(pregunta, respuesta))
+        viejo = len(self._bloques) - self.turnos_sin_comprimir - 1
+        if viejo >= 0 and isinstance(self._bloques[viejo], str):
+            self._bloques[viejo] = zlib.compress(self._bloques[viejo].encode())
+        sobrantes = len(self._bloques) - self.max_turnos
+        if sobrantes > 0:
+            del self._bloques[:sobrantes]
+            del self._preguntas[:sobrantes]
+            self.descartados += sobrantes
+
+    def ultimas_preguntas(self, n):
+        return self._preguntas[-n:]
+
+    def html(self, ultimos):
+        """Un único bloque HTML con los últimos `ultimos` intercambios."""
+        bloques = self._bloques[-ultimos:] if ultimos else []
+        return html_contenedor(
+            b if isinstance(b, str) else zlib.decompress(b).decode() for b in bloques
+        )
@@ -0,0 +1,180 @@
+"""Instrumentación liviana del camino caliente, exportable en formato Prometheus.
+
+Contadores e histogramas de proceso (`REGISTRO`), un context manager para
+medir tiempos, y un endpoint HTTP local opcional (`iniciar_servidor`) que
+sirve `/metrics` en texto Prometheus.
+"""
+import bisect
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Cubos en segundos: desde búsquedas offline (µs) hasta llamadas al modelo (decenas de s).
+CUBOS_SEGUNDOS = (0.0001, 0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+# Cubos para tamaños de prompt en tokens.
+CUBOS_TOKENS = (64, 128, 256, 512, 1024, 2048, 4096, 8192)
+
+
+def _etiquetas(etiquetas):
+    return tuple(sorted(etiquetas.items()))
+
+
+def _formatear(nombre, etiquetas, extra=()):
+    pares = [*etiquetas, *extra]
+    if not pares:
+        return nombre
+    return nombre + "{" + ",".join(f'{k}="{v}"' for k, v in pares) + "}"
+
+
+class _Histograma:
+    __slots__ = ("cubos", "conteos", "suma", "total")
+
+    def __init__(self, cubos):
+        self.cubos = cubos
+        self.conteos = [0] * (len(cubos) + 1)
+        self.suma = 0.0
+        self.total = 0
+
+    def observar(self, valor):
+        self.conteos[bisect.bisect_left(self.cubos, valor)] += 1
+        self.suma += valor
+        self.total += 1
+
+
+class Registro:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._contadores = {}  # nombre -> {etiquetas: valor}
+        self._histogramas = {}  # nombre -> {etiquetas: _Histograma}
+        self._medidores = {}  # nombre -> (tipo, función que devuelve {etiquetas|(): valor})
+        self._ayudas = {}
+
+    def describir(self, nombre, ayuda):
+        self._ayudas[nombre] = ayuda
+
+    def incrementar(self, nombre, valor=1, **etiquetas):
+        clave = _etiquetas(etiquetas)
+        with self._lock:
+            serie = self._contadores.setdefault(nombre, {})
+            serie[clave] = serie.get(clave, 0) + valor
+
+    def observar(self, nombre, valor, cubos=CUBOS_SEGUNDOS, **etiquetas):
+        clave = _etiquetas(etiquetas)
+        with self._lock:
+            serie = self._histogramas.setdefault(nombre, {})
+            histograma = serie.get(clave)
+            if histograma is None:
+                histograma = serie[clave] = _Histograma(cubos)
+            histograma.observar(valor)
+
+    def medidor(self, nombre, funcion, tipo="gauge", ayuda=None):
+        """Registra un valor calculado al exportar; `funcion()` devuelve un número o {dict_etiquetas_tupla: número}.
+
+        Con `tipo="counter"` se exporta como contador: para totales que solo
+        crecen y que ya lleva otro objeto (p. ej. los aciertos del cache).
+        """
+        self._medidores[nombre] = (tipo, funcion)
+        if ayuda:
+            self.describir(nombre, ayuda)
+
+    def contador(self, nombre, **etiquetas):
+        with self._lock:
+            return self._contadores.get(nombre, {}).get(_etiquetas(etiquetas), 0)
+
+    def exportar_prometheus(self):
+        lineas = []
+        with self._lock:
+            contadores = {n: dict(s) for n, s in self._contadores.items()}
+            histogramas = {
+                n: {k: (list(h.cubos), list(h.conteos), h.suma, h.total) for k, h in s.items()}
+                for n, s in self._histogramas.items()
+            }
+        for nombre, serie in sorted(contadores.items()):
+            self._cabecera(lineas, nombre, "counter")
+            for etiquetas, valor in sorted(serie.items()):
+                lineas.append(f"{_formatear(nombre, etiquetas)} {valor}")
+        for nombre, serie in sorted(histogramas.items()):
+            self._cabecera(lineas, nombre, "histogram")
+            for etiquetas, (cubos, conteos, suma, total) in sorted(serie.items()):
+                acumulado = 0
+                for limite, conteo in zip([*cubos, "+Inf"], conteos):
+                    acumulado += conteo
+                    lineas.append(f"{_formatear(nombre + '_bucket', etiquetas, [('le', limite)])} {acumulado}")
+                lineas.append(f"{_formatear(nombre + '_sum', etiquetas)} {suma}")
+                lineas.append(f"{_formatear(nombre + '_count', etiquetas)} {total}")
+        for nombre, (tipo, funcion) in sorted(self._medidores.items()):
+            try:
+                valor = funcion()
+            except Exception:
+                continue
+            self._cabecera(lineas, nombre, tipo)
+            if isinstance(valor, dict):
+                for etiquetas, numero in sorted(valor.items()):
+                    lineas.append(f"{_formatear(nombre, etiquetas)} {numero}")
+            else:
+                lineas.append(f"{nombre} {valor}")
+        return "\n".join(lineas) + "\n"
+
+    def _cabecera(self, lineas, nombre, tipo):
+        if nombre in self._ayudas:
+            lineas.append(f"# HELP {nombre} {self._ayudas[nombre]}")
+        lineas.append(f"# TYPE {nombre} {tipo}")
+
+
+REGISTRO = Registro()
+
+
+class medir:
+    """Context manager: `with medir("integrasalud_llm_segundos", modo="stream"): ...`"""
+
+    __slots__ = ("nombre", "etiquetas", "_inicio")
+
+    def __init__(self, nombre, **etiquetas):
+        self.nombre = nombre
+        self.etiquetas = etiquetas
+
+    def __enter__(self):
+        self._inicio = time.perf_counter()
+        return self
+
+    def __exit__(self, tipo, valor, traza):
+        REGISTRO.observar(self.nombre, time.perf_counter() - self._inicio, **self.etiquetas)
+        return False
+
+
+def medidor_desde_dict(funcion, prefijo="", claves=None, excluir=()):
+    """Adapta `funcion() -> {nombre: número}` (p. ej. `estadisticas()`) a un medidor con etiqueta `serie`.
+
+    `claves` y `excluir` eligen qué entradas se exportan, para separar los
+    totales (contadores) de los valores instantáneos (medidores) de un mismo dict.
+    """
+    return lambda: {(("serie", prefijo + clave),): valor for clave, valor in funcion().items()
+                    if isinstance(valor, (int, float)) and (claves is None or clave in claves) and clave not in excluir}
+
+
+class _ManejadorMetricas(BaseHTTPRequestHandler):
+    registro = REGISTRO
+
+    def do_GET(self):
+        if self.path.split("?")[0] != "/metrics":
+            self.send_error(404)
+            return
+        cuerpo = self.registro.exportar_prometheus().encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+        self.send_header("Content-Length", str(len(cuerpo)))
+        self.end_headers()
+        self.wfile.write(cuerpo)
+
+    def log_message(self, *args):
+        pass
+
+
+def iniciar_servidor(puerto, host="127.0.0.1"):
+    """Sirve /metrics en un hilo daemon. Devuelve el servidor (o None si el puerto está ocupado)."""
+    try:
+        servidor = ThreadingHTTPServer((host, puerto), _ManejadorMetricas)
+    except OSError:
+        return None
+    threading.Thread(target=servidor.serve_forever, name="metricas", daemon=True).start()
+    return servidor
@@ -0,0 +1,79 @@
+"""Modelo Gemini simulado para benchmarks y pruebas sin red.
+
+`instalar()` reemplaza `google.generativeai.GenerativeModel` por
+`ModeloSimulado`, con latencia y tasa de fallos configurables.
+"""
+import random
+import threading
+import time
+
+import google.generativeai as genai
+from google.api_core import exceptions as errores_google
+
+
+class _Respuesta:
+    def __init__(self, texto):
+        self.text = texto
+
+
+class _ChatSimulado:
+    def __init__(self, modelo, history):
+        self.modelo = modelo
+        self.history = list(history)
+
+    def send_message(self, content, stream=False, **kwargs):
+        return self.modelo.generate_content(self.history + [{"role": "user", "parts": [content]}], stream=stream, **kwargs)
+
+
+class ModeloSimulado:
+    latencia = 0.0
+    fragmentos = 4
+    tasa_fallos = 0.0
+    _azar = random.Random(0)
+    _lock = threading.Lock()
+    llamadas = 0
+    fallos = 0
+
+    def __init__(self, model_name="simulado", generation_config=None, **kwargs):
+        self.model_name = model_name
+
+    @classmethod
+    def configurar(cls, latencia=0.0, tasa_fallos=0.0, semilla=0):
+        cls.latencia = latencia
+        cls.tasa_fallos = tasa_fallos
+        cls._azar = random.Random(semilla)
+        cls.llamadas = 0
+        cls.fallos = 0
+
+    @classmethod
+    def _registrar_llamada(cls):
+        with cls._lock:
+            cls.llamadas += 1
+            falla = cls._azar.random() < cls.tasa_fallos
+            cls.fallos += falla
+        if falla:
+            time.sleep(cls.latencia / 2)
+            raise errores_google.ServiceUnavailable("fallo simulado")
+
+    def generate_content(self, contents, stream=False, **kwargs):
+        self._registrar_llamada()
+        texto = f"Respuesta simulada a: {str(contents)[-80:]}"
+        if not stream:
+            time.sleep(self.latencia)
+            return _Respuesta(texto)
+        return self._transmitir(texto)
+
+    def start_chat(self, history=None):
+        return _ChatSimulado(self, history or [])
+
+    def _transmitir(self, texto):
+        paso = max(1, len(texto) // self.fragmentos)
+        for inicio in range(0, len(texto), paso):
+            time.sleep(self.latencia / self.fragmentos)
+            yield _Respuesta(texto[inicio:inicio + paso])
+
+
+def instalar(latencia=0.0, tasa_fallos=0.0, semilla=0):
+    ModeloSimulado.configurar(latencia, tasa_fallos, semilla)
+    genai.GenerativeModel = ModeloSimulado
+    return ModeloSimulado
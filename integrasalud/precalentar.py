@@ -0,0 +1,180 @@
+"""Precalentamiento del cache de respuestas con preguntas anticipadas.
+
+Lee un TOML con una lista de preguntas por categoría, arma cada prompt igual
+que la app (`construir_prompt` con el `system_prompt` de `contenido.toml`),
+consulta a Gemini con concurrencia acotada y un tope de llamadas por segundo,
+y guarda cada respuesta en el cache apenas llega. Si se interrumpe, la
+siguiente corrida saltea lo que ya está en el cache vigente para esa versión
+del prompt. Al arrancar, la app siembra sus índices offline con ese cache.
+
+Uso:
+    python -m integrasalud.precalentar preguntas_anticipadas.toml --concurrencia 4 --por-segundo 2
+    python -m integrasalud.precalentar preguntas_anticipadas.toml --simulado   # sin red
+
+Con `--simulado` las respuestas son de relleno, así que por defecto se
+guardan en un cache temporal y nunca en el de producción.
+"""
+import argparse
+import os
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from pathlib import Path
+
+from integrasalud import config
+from integrasalud.cache_respuestas import CacheRespuestas
+from integrasalud.catalogo import Catalogo, leer_toml
+from integrasalud.cliente import (
+    ERRORES_TRANSITORIOS, MODELO_POR_DEFECTO, ClienteGemini, construir_prompt, parametros_desde_config,
+)
+from integrasalud.ejecutor import EjecutorLLM
+from integrasalud.texto import normalizar
+
+DIRECTORIO_APP = Path(__file__).resolve().parent.parent
+CACHE_SIMULADO = Path(tempfile.gettempdir()) / "integrasalud-precalentar-simulado.sqlite3"
+
+
+class LimitadorTasa:
+    """Balde de fichas: como mucho `por_segundo` llamadas por segundo, con ráfagas de hasta `rafaga`."""
+
+    def __init__(self, por_segundo, rafaga=1, reloj=time.monotonic):
+        self.por_segundo = por_segundo
+        self.rafaga = rafaga
+        self._reloj = reloj
+        self._fichas = float(rafaga)
+        self._ultimo = reloj()
+        self._lock = threading.Lock()
+
+    def esperar(self):
+        if self.por_segundo <= 0:
+            return
+        while True:
+            with self._lock:
+                ahora = self._reloj()
+                self._fichas = min(self.rafaga, self._fichas + (ahora - self._ultimo) * self.por_segundo)
+                self._ultimo = ahora
+                if self._fichas >= 1:
+                    self._fichas -= 1
+                    return
+                falta = (1 - self._fichas) / self.por_segundo
+            time.sleep(falta)
+
+
+def pendientes(catalogo, cache, preguntas):
+    """Separa las preguntas que requieren una llamada de las que ya se resuelven sin red.
+
+    Devuelve (tareas, salteadas): `tareas` son tuplas (categoria, pregunta, version)
+    y `salteadas` cuenta por motivo ("cache", "offline", "categoria").
+    """
+    tareas = []
+    salteadas = {"cache": 0, "offline": 0, "categoria": 0}
+    for categoria, lista in preguntas.items():
+        if categoria not in catalogo.categorias:
+            salteadas["categoria"] += len(lista)
+            continue
+        version = catalogo.versiones_prompt[categoria]
+        cacheadas = {consulta for consulta, _ in cache.entradas(categoria, version)}
+        vistas = set()
+        for pregunta in lista:
+            normalizada = normalizar(pregunta)
+            if not normalizada or normalizada in vistas:
+                continue
+            vistas.add(normalizada)
+            if normalizada in cacheadas:
+                salteadas["cache"] += 1
+            elif catalogo.indices_faq[categoria].buscar(catalogo.corrector.corregir(normalizada)) is not None:
+                salteadas["offline"] += 1
+            else:
+                tareas.append((categoria, pregunta, version))
+    return tareas, salteadas
+
+
+def precalentar(catalogo, cache, modelo, preguntas, concurrencia=4, por_segundo=2.0, plazo=60.0,
+                reintentos=3, al_terminar=None):
+    """Genera y guarda las respuestas faltantes. Devuelve un dict con los conteos."""
+    tareas, salteadas = pendientes(catalogo, cache, preguntas)
+    limitador = LimitadorTasa(por_segundo, rafaga=concurrencia)
+    ejecutor = EjecutorLLM(max_concurrencia=concurrencia, max_cola=concurrencia, plazo=plazo,
+                           reintentos=reintentos, transitorios=ERRORES_TRANSITORIOS)
+    resumen = {"generadas": 0, "fallidas": 0, **{f"salteadas_{motivo}": n for motivo, n in salteadas.items()}}
+
+    def responder(tarea):
+        categoria, pregunta, version = tarea
+        prompt = construir_prompt(catalogo[categoria]["system_prompt"], pregunta)
+
+        def generar(restante):
+            limitador.esperar()  # también frena los reintentos
+            return modelo.generate_content(prompt, request_options={"timeout": restante}).text
+
+        respuesta = ejecutor.ejecutar(generar)
+        cache.guardar(categoria, pregunta, version, respuesta)
+        return respuesta
+
+    with ThreadPoolExecutor(concurrencia, thread_name_prefix="precalentar") as pool:
+        futuros = {pool.submit(responder, tarea): tarea for tarea in tareas}
+        try:
+            for futuro in as_completed(futuros):
+                error = futuro.exception()
+                resumen["fallidas" if error else "generadas"] += 1
+                if al_terminar is not None:
+                    al_terminar(futuros[futuro], error)
+        except KeyboardInterrupt:
+            # Lo ya guardado queda en el cache; la próxima corrida retoma desde ahí.
+            pool.shutdown(wait=True, cancel_futures=True)
+            raise
+    return resumen
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("preguntas", help="TOML con una lista de preguntas por categoría")
+    parser.add_argument("--contenido", default=config.leer("contenido", str(DIRECTORIO_APP / "contenido.toml")))
+    parser.add_argument("--cache-db", help="por defecto, el cache de la app (o uno temporal con --simulado)")
+    parser.add_argument("--concurrencia", type=int, default=4)
+    parser.add_argument("--por-segundo", type=float, default=2.0, help="tope de llamadas por segundo (0 = sin tope)")
+    parser.add_argument("--plazo", type=float, default=60.0, help="segundos máximos por pregunta")
+    parser.add_argument("--simulado", action="store_true", help="usa el modelo simulado en lugar de Gemini")
+    parser.add_argument("--latencia", type=float, default=0.2, help="latencia del modelo simulado, en segundos")
+    args = parser.parse_args(argv)
+
+    cache_produccion = config.leer("cache_db", str(DIRECTORIO_APP / "cache_respuestas.sqlite3"))
+    if args.cache_db is None:
+        args.cache_db = str(CACHE_SIMULADO) if args.simulado else cache_produccion
+    if args.simulado and Path(args.cache_db).resolve() == Path(cache_produccion).resolve():
+        sys.exit(f"--simulado no escribe en el cache de producción ({cache_produccion}); usá otro --cache-db.")
+    if args.simulado:
+        from integrasalud import modelo_simulado
+
+        modelo_simulado.instalar(latencia=args.latencia)
+    cliente = ClienteGemini(
+        os.environ.get("GOOGLE_API_KEY", "simulada" if args.simulado else None),
+        config.leer("gemini_modelo", MODELO_POR_DEFECTO),
+        parametros_desde_config(),
+    )
+    if not cliente.listo:
+        sys.exit(f"No se pudo configurar Gemini ({cliente.estado}): definí GOOGLE_API_KEY o usá --simulado.")
+
+    cache = CacheRespuestas(args.cache_db, capacidad=config.leer("cache_capacidad", 5000),
+                            ttl=config.leer("cache_ttl_segundos", 7 * 24 * 3600))
+    catalogo = Catalogo.desde_archivo(args.contenido)
+
+    def al_terminar(tarea, error):
+        categoria, pregunta, _ = tarea
+        estado = f"error: {error}" if error else "ok"
+        print(f"[{categoria}] {pregunta} -> {estado}", flush=True)
+
+    inicio = time.perf_counter()
+    try:
+        resumen = precalentar(catalogo, cache, cliente.modelo, leer_toml(args.preguntas),
+                              concurrencia=args.concurrencia, por_segundo=args.por_segundo,
+                              plazo=args.plazo, al_terminar=al_terminar)
+    except KeyboardInterrupt:
+        sys.exit("Interrumpido; lo generado quedó guardado y la próxima corrida sigue desde ahí.")
+    print(" ".join(f"{clave}={valor}" for clave, valor in resumen.items()), f"({time.perf_counter() - inicio:.1f} s)")
+    return 1 if resumen["fallidas"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,322 @@
+"""Registro asíncrono de consultas y promoción de respuestas online frecuentes.
+
+`RegistroConsultas.anotar()` solo encola el registro (categoría, consulta
+normalizada, ruta, segundos); un hilo aparte los escribe en lotes a un JSONL
+por proceso, que al pasar `max_bytes` se comprime a `.jsonl.gz` y rota.
+
+`promover()` busca las consultas más frecuentes que alguna vez necesitaron
+al modelo (las que tienen respuesta online en el cache) y anota esa
+respuesta en `promovidas.toml` como candidata (`aprobada = false`). Una
+persona del equipo revisa el archivo, corrige el texto si hace falta y marca
+`aprobada = true`; recién entonces el catálogo la responde offline (por
+consulta exacta y en el índice semántico), fija aunque el cache la venza o
+desaloje.
+
+Uso:
+    python -m integrasalud.registro_consultas resumen
+    python -m integrasalud.registro_consultas promover --minimo 3
+"""
+import argparse
+import gzip
+import json
+import logging
+import os
+import queue
+import tempfile
+import threading
+import time
+from collections import Counter
+from pathlib import Path
+
+from integrasalud import config
+from integrasalud.cache_respuestas import CacheRespuestas
+from integrasalud.catalogo import Catalogo, leer_toml
+
+logger = logging.getLogger(__name__)
+
+_FIN = object()
+
+
+class RegistroConsultas:
+    def __init__(self, directorio, lote=200, intervalo=2.0, max_bytes=5 * 1024 * 1024, conservar=20,
+                 max_pendientes=10000):
+        self.directorio = Path(directorio)
+        self.directorio.mkdir(parents=True, exist_ok=True)
+        self.lote = lote
+        self.intervalo = intervalo
+        self.max_bytes = max_bytes
+        self.conservar = conservar
+        self.ruta = self.directorio / f"consultas-{os.getpid()}.jsonl"
+        self._cola = queue.Queue(max_pendientes)
+        self.escritos = 0
+        self.descartados = 0
+        self.rotaciones = 0
+        self._hilo = threading.Thread(target=self._escribir, name="registro-consultas", daemon=True)
+        self._hilo.start()
+
+    def anotar(self, categoria, consulta, ruta, segundos):
+        """No bloquea: si el escritor se atrasa demasiado, el registro se descarta."""
+        try:
+            self._cola.put_nowait({"t": round(time.time(), 3), "categoria": categoria, "consulta": consulta,
+                                   "ruta": ruta, "segundos": round(segundos, 4)})
+        except queue.Full:
+            self.descartados += 1
+
+    def cerrar(self, timeout=5.0):
+        """Escribe lo pendiente y detiene el hilo."""
+        self._cola.put(_FIN)
+        self._hilo.join(timeout)
+
+    def estadisticas(self):
+        return {"pendientes": self._cola.qsize(), "escritos": self.escritos,
+                "descartados": self.descartados, "rotaciones": self.rotaciones}
+
+    def _escribir(self):
+        terminar = False
+        while not terminar:
+            lote = []
+            limite = time.monotonic() + self.intervalo
+            while len(lote) < self.lote:
+                try:
+                    registro = self._cola.get(timeout=max(0.0, limite - time.monotonic()))
+                except queue.Empty:
+                    break
+                if registro is _FIN:
+                    terminar = True
+                    break
+                lote.append(registro)
+            if not lote:
+                continue
+            try:
+                with open(self.ruta, "a", encoding="utf-8") as archivo:
+                    archivo.writelines(json.dumps(r, ensure_ascii=False) + "\n" for r in lote)
+                self.escritos += len(lote)
+                if self.ruta.stat().st_size >= self.max_bytes:
+                    self._rotar()
+            except OSError:
+                logger.exception("No se pudo escribir el registro de consultas en %s", self.ruta)
+
+    def _rotar(self):
+        destino = self.ruta.with_name(f"{self.ruta.stem}-{time.strftime('%Y%m%d-%H%M%S')}-{self.rotaciones:04d}.jsonl.gz")
+        with open(self.ruta, "rb") as origen, gzip.open(destino, "wb") as comprimido:
+            comprimido.writelines(origen)
+        self.ruta.unlink()
+        self.rotaciones += 1
+        rotados = sorted(self.directorio.glob("consultas-*.jsonl.gz"), key=lambda ruta: ruta.stat().st_mtime)
+        for viejo in rotados[:-self.conservar]:
+            viejo.unlink(missing_ok=True)
+
+
+def leer(directorio, desde=0.0):
+    """Registros de todos los procesos (activos y rotados) con `t >= desde`."""
+    for ruta in sorted(Path(directorio).glob("consultas-*.jsonl*")):
+        abrir = gzip.open if ruta.suffix == ".gz" else open
+        try:
+            with abrir(ruta, "rt", encoding="utf-8") as archivo:
+                for linea in archivo:
+                    try:
+                        registro = json.loads(linea)
+                    except ValueError:  # línea cortada por una escritura en curso
+                        continue
+                    if registro.get("t", 0) >= desde:
+                        yield registro
+        except (OSError, EOFError):
+            continue
+
+
+# Rutas en las que la consulta registrada es literalmente la que se respondió
+# (una respuesta online vuelve después como "cache" u "offline").
+RUTAS_LITERALES = ("online", "cache", "offline")
+
+
+def mas_frecuentes(registros, rutas=("online",)):
+    """Counter {(categoria, consulta): veces} de los registros con alguna de esas rutas."""
+    return Counter((r["categoria"], r["consulta"]) for r in registros if r.get("ruta") in rutas)
+
+
+def _toml_cadena(texto):
+    # Una cadena JSON sin escapes propios de JSON (ensure_ascii=False) es también una cadena básica TOML válida.
+    return json.dumps(texto, ensure_ascii=False)
+
+
+def escribir_promovidas(ruta, promovidas):
+    """`promovidas` es {categoria: {consulta: {"respuesta", "version", "veces", "aprobada"}}}.
+
+    Se escribe de forma atómica y solo si el contenido cambió (el catálogo se
+    recarga cada vez que cambia el mtime del archivo). Devuelve True si escribió.
+    """
+    lineas = ["# Generado por integrasalud.registro_consultas: respuestas online frecuentes candidatas",
+              "# a servirse offline. Solo se usan las que tienen `aprobada = true`: revisá el texto,",
+              "# corregilo si hace falta y aprobala a mano. Lo demás se puede borrar.", ""]
+    for categoria, entradas in sorted(promovidas.items()):
+        lineas.append(f"[{_toml_cadena(categoria)}]")
+        for consulta, datos in sorted(entradas.items(), key=lambda par: -par[1]["veces"]):
+            lineas.append(f"{_toml_cadena(consulta)} = {{ respuesta = {_toml_cadena(datos['respuesta'])}, "
+                          f"version = {_toml_cadena(datos['version'])}, veces = {int(datos['veces'])}, "
+                          f"aprobada = {'true' if datos.get('aprobada') is True else 'false'} }}")
+        lineas.append("")
+    texto = "\n".join(lineas)
+    try:
+        with open(ruta, encoding="utf-8", newline="") as archivo:
+            if archivo.read() == texto:
+                return False
+    except FileNotFoundError:
+        pass
+    ruta = Path(ruta)
+    descriptor, temporal = tempfile.mkstemp(prefix=f"{ruta.name}.", suffix=".tmp", dir=ruta.parent)
+    try:
+        with os.fdopen(descriptor, "w", encoding="utf-8", newline="") as archivo:
+            archivo.write(texto)
+        os.replace(temporal, ruta)
+    except BaseException:
+        Path(temporal).unlink(missing_ok=True)
+        raise
+    return True
+
+
+def sembrado_promovidas(promovidas):
+    """Adapta las entradas aprobadas de `promovidas.toml` a `aprobadas(categoria, version)` del catálogo."""
+    def aprobadas(categoria, version):
+        return [(consulta, datos["respuesta"]) for consulta, datos in promovidas.get(categoria, {}).items()
+                if datos.get("aprobada") is True and datos.get("version") == version]
+    return aprobadas
+
+
+def leer_promovidas(ruta):
+    return leer_toml(ruta) if os.path.exists(ruta) else {}
+
+
+def promover(directorio, cache, versiones, ruta_promovidas, minimo=3, maximo=50, ventana=30 * 24 * 3600):
+    """Propone como candidatas las consultas respondidas online más frecuentes de los últimos `ventana` segundos.
+
+    Cuentan todas las veces que se hizo la consulta, no solo las que fueron
+    online: tras la primera respuesta el proceso la sirve desde su índice.
+    Solo se promueve si se hizo al menos `minimo` veces y su respuesta sigue
+    en el cache para la versión vigente del prompt
+    (`versiones` = {categoria: version}); eso deja afuera errores,
+    respuestas con contexto de conversación y prompts ya cambiados. Las
+    promociones anteriores se conservan mientras su versión siga vigente
+    (una vez promovida, la consulta ya no vuelve a ir online). Las nuevas
+    quedan con `aprobada = false`; de las ya aprobadas solo se actualiza
+    `veces`, nunca el texto revisado. Al recortar a `maximo` por categoría
+    se conservan primero las aprobadas. Devuelve {categoria: cantidad de
+    candidatas nuevas}.
+    """
+    conteos = mas_frecuentes(leer(directorio, desde=time.time() - ventana), RUTAS_LITERALES)
+    promovidas = {
+        categoria: {consulta: dict(datos) for consulta, datos in entradas.items()
+                    if datos.get("version") == versiones.get(categoria)}
+        for categoria, entradas in leer_promovidas(ruta_promovidas).items()
+    }
+    respuestas = {categoria: dict(cache.entradas(categoria, version)) for categoria, version in versiones.items()}
+    nuevas = Counter()
+    for (categoria, consulta), veces in conteos.most_common():
+        if veces < minimo:
+            break
+        respuesta = respuestas.get(categoria, {}).get(consulta)
+        if respuesta is None:
+            continue
+        entradas = promovidas.setdefault(categoria, {})
+        anterior = entradas.get(consulta)
+        nuevas[categoria] += anterior is None
+        if anterior is not None and anterior.get("aprobada") is True:
+            anterior["veces"] = max(veces, anterior["veces"])
+            continue
+        entradas[consulta] = {"respuesta": respuesta, "version": versiones[categoria],
+                              "veces": max(veces, anterior["veces"] if anterior else 0), "aprobada": False}
+    for categoria, entradas in promovidas.items():
+        if len(entradas) > maximo:
+            orden = sorted(entradas.items(), key=lambda par: (par[1].get("aprobada") is not True, -par[1]["veces"]))
+            promovidas[categoria] = dict(orden[:maximo])
+    promovidas = {categoria: entradas for categoria, entradas in promovidas.items() if entradas}
+    if promovidas or os.path.exists(ruta_promovidas):
+        escribir_promovidas(ruta_promovidas, promovidas)
+    return dict(+nuevas)  # sin las categorías en 0
+
+
+def _tomar_bloqueo(ruta):
+    """Bloqueo exclusivo sobre `ruta` mientras el archivo devuelto siga abierto; None si lo tiene otro proceso."""
+    archivo = open(ruta, "a+b")
+    try:
+        if os.name == "nt":
+            import msvcrt
+
+            msvcrt.locking(archivo.fileno(), msvcrt.LK_NBLCK, 1)
+        else:
+            import fcntl
+
+            fcntl.flock(archivo.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+    except OSError:
+        archivo.close()
+        return None
+    return archivo
+
+
+def promover_periodicamente(intervalo, promover_ahora, bloqueo=None):
+    """Corre `promover_ahora()` cada `intervalo` segundos en un hilo daemon.
+
+    Con `bloqueo` (ruta de un archivo), de todos los procesos que comparten
+    esa ruta solo promueve el que tiene el bloqueo; si ese proceso termina,
+    el sistema lo libera y lo toma otro en su próximo ciclo.
+    """
+    def ciclo():
+        tomado = None
+        while True:
+            time.sleep(intervalo)
+            if bloqueo is not None and tomado is None:
+                tomado = _tomar_bloqueo(bloqueo)
+                if tomado is None:
+                    continue
+            try:
+                nuevas = promover_ahora()
+            except Exception:
+                logger.exception("Falló la promoción de consultas frecuentes")
+            else:
+                if nuevas:
+                    logger.info("Consultas frecuentes propuestas para servir offline (pendientes de aprobación): %s", nuevas)
+
+    hilo = threading.Thread(target=ciclo, name="promocion", daemon=True)
+    hilo.start()
+    return hilo
+
+
+def main(argv=None):
+    directorio_app = Path(__file__).resolve().parent.parent
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("accion", choices=["resumen", "promover"])
+    parser.add_argument("--registros", default=config.leer("consultas_dir", str(directorio_app / "registros")))
+    parser.add_argument("--dias", type=float, default=30, help="antigüedad máxima de los registros considerados")
+    parser.add_argument("--top", type=int, default=20)
+    parser.add_argument("--minimo", type=int, default=config.leer("promocion_minimo", 3))
+    parser.add_argument("--contenido", default=config.leer("contenido", str(directorio_app / "contenido.toml")))
+    parser.add_argument("--cache-db", default=config.leer("cache_db", str(directorio_app / "cache_respuestas.sqlite3")))
+    parser.add_argument("--promovidas", default=config.leer("promovidas", str(directorio_app / "promovidas.toml")))
+    args = parser.parse_args(argv)
+    ventana = args.dias * 24 * 3600
+
+    if args.accion == "resumen":
+        registros = list(leer(args.registros, desde=time.time() - ventana))
+        rutas = Counter(r.get("ruta") for r in registros)
+        total = sum(rutas.values()) or 1
+        print(f"{len(registros)} consultas en los últimos {args.dias:g} días")
+        for ruta, n in rutas.most_common():
+            print(f"  {ruta:<10} {n:>7}  {100 * n / total:5.1f}%")
+        print(f"Consultas que más van online (top {args.top}):")
+        for (categoria, consulta), n in mas_frecuentes(registros).most_common(args.top):
+            print(f"  {n:>5}  [{categoria}] {consulta}")
+        pendientes = [(categoria, consulta) for categoria, entradas in leer_promovidas(args.promovidas).items()
+                      for consulta, datos in entradas.items() if datos.get("aprobada") is not True]
+        print(f"Candidatas sin aprobar en {args.promovidas}: {len(pendientes)}")
+        for categoria, consulta in pendientes[:args.top]:
+            print(f"         [{categoria}] {consulta}")
+        return 0
+
+    cache = CacheRespuestas(args.cache_db, ttl=config.leer("cache_ttl_segundos", 7 * 24 * 3600))
+    versiones = Catalogo.desde_archivo(args.contenido).versiones_prompt
+    promovidas = promover(args.registros, cache, versiones, args.promovidas, minimo=args.minimo, ventana=ventana)
+    print(f"Candidatas nuevas: {promovidas or 'ninguna'} -> {args.promovidas} (aprobalas a mano con `aprobada = true`)")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
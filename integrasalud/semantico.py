@@ -0,0 +1,167 @@
+"""Recuperación local por similitud (TF-IDF sobre n-gramas hasheados, sin red).
+
+Cada entrada (frase curada, respuesta aprobada o consulta del cache de
+respuestas) se representa con palabras y n-gramas de caracteres hasheados a
+una dimensión fija. Los vectores se guardan dispersos (solo los rasgos
+presentes, unas decenas por frase) y todas las filas se concatenan en una
+única matriz dispersa normalizada: una consulta se resuelve con una pasada
+vectorizada sobre esos arreglos. La matriz se vuelve a armar, con el idf al
+día, en la primera búsqueda después de un cambio.
+
+Los n-gramas de caracteres toleran variantes ("ataque"/"ataques"), pero
+también acercan textos que no tienen nada que ver ("dengue" y "relaciones"
+comparten "cuido"). Por eso el umbral es alto y, además, la entrada elegida
+tiene que compartir con la consulta al menos una palabra significativa.
+
+Las consultas del cache no guardan su respuesta: se agregan con
+`respuesta=None` y al encontrarlas se pide la respuesta al cache (`resolver`),
+así se respetan su TTL y su LRU. Son como mucho `max_consultas`; al pasarse
+se olvida la más vieja.
+"""
+import threading
+import zlib
+from collections import OrderedDict
+
+import numpy as np
+
+from integrasalud.texto import normalizar, tokenizar
+
+DIMENSION = 4096
+N_GRAMAS = (3, 4)
+PESO_PALABRA = 2.0
+
+
+def _rasgos(texto):
+    for palabra in tokenizar(normalizar(texto)):
+        yield "w:" + palabra, PESO_PALABRA
+        marcada = f"<{palabra}>"
+        for n in N_GRAMAS:
+            for i in range(len(marcada) - n + 1):
+                yield marcada[i:i + n], 1.0
+
+
+class _Fila:
+    __slots__ = ("clave", "indices", "crudo", "palabras", "respuesta")
+
+    def __init__(self, clave, indices, crudo, palabras, respuesta):
+        self.clave = clave
+        self.indices = indices  # rasgos presentes (int32, sin repetir)
+        self.crudo = crudo  # tf sublineal de cada rasgo
+        self.palabras = palabras  # palabras significativas
+        self.respuesta = respuesta  # None: la respuesta está en el cache
+
+
+class _Matriz:
+    """Foto inmutable de las filas: rasgos concatenados con su peso tf-idf normalizado."""
+
+    __slots__ = ("filas", "indices", "pesos", "inicios", "idf")
+
+    def __init__(self, filas, df, dimension):
+        self.filas = filas
+        n = len(filas)
+        self.idf = (np.log((1 + n) / (1 + df)) + 1).astype(np.float32)
+        if not n:
+            self.indices = np.zeros(0, dtype=np.int32)
+            self.pesos = np.zeros(0, dtype=np.float32)
+            self.inicios = np.zeros(0, dtype=np.int64)
+            return
+        largos = np.fromiter((len(fila.indices) for fila in filas), dtype=np.int64, count=n)
+        self.inicios = np.concatenate(([0], np.cumsum(largos)[:-1]))
+        self.indices = np.concatenate([fila.indices for fila in filas])
+        self.pesos = np.concatenate([fila.crudo for fila in filas]) * self.idf[self.indices]
+        normas = np.sqrt(np.add.reduceat(self.pesos * self.pesos, self.inicios))
+        self.pesos /= np.repeat(np.maximum(normas, 1e-12), largos)
+
+
+class IndiceSemantico:
+    def __init__(self, dimension=DIMENSION, umbral=0.62, max_consultas=5000):
+        self.dimension = dimension
+        self.umbral = umbral
+        self.max_consultas = max_consultas
+        self._lock = threading.Lock()
+        self._filas = {}  # texto normalizado -> _Fila
+        self._consultas = OrderedDict()  # claves de las filas que remiten al cache, de la más vieja a la más nueva
+        self._df = np.zeros(dimension, dtype=np.float32)
+        self._matriz = None  # se arma en la próxima búsqueda
+
+    def __len__(self):
+        return len(self._filas)
+
+    def vectorizar(self, texto):
+        """(indices, tf sublineal) de los rasgos de `texto`, como vector disperso."""
+        conteos = {}
+        for rasgo, peso in _rasgos(texto):
+            indice = zlib.crc32(rasgo.encode()) % self.dimension
+            conteos[indice] = conteos.get(indice, 0.0) + peso
+        indices = np.fromiter(conteos, dtype=np.int32, count=len(conteos))
+        crudo = np.log1p(np.fromiter(conteos.values(), dtype=np.float32, count=len(conteos)))
+        return indices, crudo
+
+    def agregar(self, texto, respuesta=None):
+        """Agrega una entrada; sin `respuesta`, es una consulta cuya respuesta se pide al cache."""
+        clave = normalizar(texto)
+        indices, crudo = self.vectorizar(clave)
+        if not len(indices):
+            return
+        with self._lock:
+            anterior = self._filas.get(clave)
+            if anterior is not None:
+                if respuesta is not None:
+                    anterior.respuesta = respuesta
+                    self._consultas.pop(clave, None)
+                elif clave in self._consultas:
+                    self._consultas.move_to_end(clave)
+                return
+            self._filas[clave] = _Fila(clave, indices, crudo, frozenset(tokenizar(clave)), respuesta)
+            self._df[indices] += 1
+            if respuesta is None:
+                self._consultas[clave] = None
+                while len(self._consultas) > self.max_consultas:
+                    self._quitar(self._consultas.popitem(last=False)[0])
+            self._matriz = None
+
+    def olvidar(self, texto):
+        """Quita una consulta que remitía al cache (las entradas con respuesta propia quedan)."""
+        clave = normalizar(texto)
+        with self._lock:
+            if self._consultas.pop(clave, 0) is None:
+                self._quitar(clave)
+
+    def buscar(self, query, resolver=None):
+        """Devuelve (respuesta, similitud) de la entrada más parecida, o (None, similitud).
+
+        Solo se aceptan entradas que superen el umbral y compartan alguna palabra
+        significativa con la consulta. Las que remiten al cache se resuelven con
+        `resolver(consulta)`; si ya no está, se quitan y se sigue con la próxima.
+        """
+        indices, crudo = self.vectorizar(query)
+        palabras = set(tokenizar(normalizar(query)))
+        with self._lock:
+            if self._matriz is None:
+                self._matriz = _Matriz(tuple(self._filas.values()), self._df, self.dimension)
+            matriz = self._matriz
+        if not matriz.filas or not len(indices):
+            return None, 0.0
+        q = np.zeros(self.dimension, dtype=np.float32)
+        q[indices] = crudo * matriz.idf[indices]
+        q /= max(float(np.linalg.norm(q)), 1e-12)
+        similitudes = np.add.reduceat(q[matriz.indices] * matriz.pesos, matriz.inicios)
+        candidatas = np.flatnonzero(similitudes >= self.umbral)
+        for posicion in candidatas[np.argsort(-similitudes[candidatas], kind="stable")]:
+            fila = matriz.filas[posicion]
+            if not palabras & fila.palabras:
+                continue
+            respuesta = fila.respuesta
+            if respuesta is None:
+                respuesta = resolver(fila.clave) if resolver is not None else None
+                if respuesta is None:  # vencida o desalojada del cache
+                    self.olvidar(fila.clave)
+                    continue
+            return respuesta, float(similitudes[posicion])
+        return None, float(similitudes.max())
+
+    def _quitar(self, clave):
+        fila = self._filas.pop(clave, None)
+        if fila is not None:
+            self._df[fila.indices] -= 1
+            self._matriz = None
@@ -0,0 +1,26 @@
+"""Normalización de texto compartida por los buscadores offline."""
+import re
+import unicodedata
+
+_ESPACIOS = re.compile(r"\s+")
+
+
+def normalizar(texto):
+    """Minúsculas, sin tildes y con espacios colapsados ("  Estrés " -> "estres")."""
+    descompuesto = unicodedata.normalize("NFKD", texto.casefold())
+    sin_tildes = "".join(c for c in descompuesto if not unicodedata.combining(c))
+    return _ESPACIOS.sub(" ", sin_tildes).strip()
+
+
+# Palabras vacías frecuentes en las consultas; no aportan al parecido entre preguntas.
+PALABRAS_VACIAS = frozenset("""
+a al algo como con cual cuales de del el en es esta este esto estoy hay la las lo los me mi mis muy
+no o para pero por que quiero saber se si sobre soy su sus te tengo todo tu un una uno unos y ya yo
+""".split())
+
+_PALABRA = re.compile(r"\w+")
+
+
+def tokenizar(texto_normalizado):
+    """Palabras significativas de un texto ya normalizado."""
+    return [p for p in _PALABRA.findall(texto_normalizado) if p not in PALABRAS_VACIAS]
@@ -0,0 +1,142 @@
+"""Asignador de códigos de turno anónimos, únicos y validables en recepción.
+
+Los códigos tienen la forma PALABRA-PALABRA-NNNN (~41 millones de
+combinaciones), se sortean con `secrets` y se registran en SQLite (modo WAL).
+La unicidad la garantiza la clave primaria: si dos sesiones sortean el
+mismo código, el INSERT de la segunda falla y se vuelve a sortear. Cada hilo
+usa su propia conexión, sin un lock global en Python.
+"""
+import re
+import secrets
+import sqlite3
+import threading
+import time
+
+PALABRAS = (
+    "LUNA", "SOL", "RIOJA", "SALTA", "NORTE", "CEIBO", "FLOR", "PAZ",
+    "RIO", "MONTE", "ALGARROBO", "QUEBRACHO", "MISTOL", "TALA", "BREA", "PALMA",
+    "NUBE", "LLUVIA", "VIENTO", "ESTRELLA", "CIELO", "CAMPO", "SIERRA", "LAGUNA",
+    "DULCE", "SALADO", "ZAMBA", "BOMBO", "GUITARRA", "VIOLIN", "COPLA", "CARDON",
+    "JARILLA", "TUNA", "HORNERO", "CALANDRIA", "TERO", "CARDENAL", "ZORZAL", "COLIBRI",
+    "PUMA", "GUANACO", "TATU", "MULITA", "ALFALFA", "MAIZ", "ALGODON", "MELON",
+    "SANDIA", "ZAPALLO", "TRIGO", "AROMO", "JACARANDA", "LAPACHO", "TIPA", "OMBU",
+    "SAUCE", "TUSCA", "CHILCA", "ROMERO", "ARCO", "FAROL", "PUENTE", "PLAZA",
+)
+_FORMATO = re.compile(r"^([A-Z]+)-([A-Z]+)-(\d{4})$")
+
+_ESQUEMA = """
+CREATE TABLE IF NOT EXISTS turnos (
+    codigo TEXT PRIMARY KEY,
+    centro TEXT NOT NULL,
+    especialidad TEXT NOT NULL,
+    emitido REAL NOT NULL,
+    vence REAL NOT NULL,
+    canjeado REAL
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS turnos_centro ON turnos (centro, especialidad);
+CREATE INDEX IF NOT EXISTS turnos_vence ON turnos (vence) WHERE canjeado IS NULL;
+"""
+
+
+class CodigoAgotado(Exception):
+    """No se encontró un código libre tras varios intentos (espacio casi lleno)."""
+
+
+def generar_codigo():
+    numero = secrets.randbelow(10000)
+    return f"{secrets.choice(PALABRAS)}-{secrets.choice(PALABRAS)}-{numero:04d}"
+
+
+def normalizar_codigo(codigo):
+    """Acepta minúsculas, espacios o guiones de más: " luna sol 0042 " -> "LUNA-SOL-0042"."""
+    partes = re.split(r"[\s\-_]+", codigo.strip().upper())
+    if len(partes) == 3 and partes[2].isdigit():
+        partes[2] = partes[2].zfill(4)
+    return "-".join(p for p in partes if p)
+
+
+class AsignadorTurnos:
+    def __init__(self, ruta, vigencia=30 * 24 * 3600, intentos=8, limpiar_cada=1000, reloj=time.time):
+        self.ruta = str(ruta)
+        self.vigencia = vigencia
+        self.intentos = intentos
+        self.limpiar_cada = limpiar_cada
+        self._reloj = reloj
+        self._local = threading.local()
+        self._contador_lock = threading.Lock()
+        self._emitidos_desde_limpieza = 0
+        self.colisiones = 0
+        with self._conexion() as conexion:
+            conexion.executescript(_ESQUEMA)
+
+    def emitir(self, centro, especialidad):
+        """Registra y devuelve un código nuevo: {"codigo", "centro", "especialidad", "vence"}."""
+        conexion = self._conexion()
+        ahora = self._reloj()
+        vence = ahora + self.vigencia
+        for _ in range(self.intentos):
+            codigo = generar_codigo()
+            try:
+                with conexion:
+                    conexion.execute(
+                        "INSERT INTO turnos (codigo, centro, especialidad, emitido, vence) VALUES (?, ?, ?, ?, ?)",
+                        (codigo, centro, especialidad, ahora, vence),
+                    )
+            except sqlite3.IntegrityError:
+                with self._contador_lock:
+                    self.colisiones += 1
+                continue
+            self._quizas_limpiar()
+            return {"codigo": codigo, "centro": centro, "especialidad": especialidad, "vence": vence}
+        raise CodigoAgotado(f"sin código libre tras {self.intentos} intentos")
+
+    def validar(self, codigo, centro=None):
+        """Devuelve el turno vigente y sin canjear (opcionalmente del centro indicado) o None."""
+        codigo = normalizar_codigo(codigo)
+        if not _FORMATO.match(codigo):
+            return None
+        fila = self._conexion().execute(
+            "SELECT codigo, centro, especialidad, vence FROM turnos"
+            " WHERE codigo=? AND canjeado IS NULL AND vence > ?",
+            (codigo, self._reloj()),
+        ).fetchone()
+        if fila is None or (centro is not None and fila[1] != centro):
+            return None
+        return {"codigo": fila[0], "centro": fila[1], "especialidad": fila[2], "vence": fila[3]}
+
+    def canjear(self, codigo, centro=None):
+        """Marca el código como usado en recepción. Devuelve True si estaba vigente."""
+        conexion = self._conexion()
+        ahora = self._reloj()
+        consulta = "UPDATE turnos SET canjeado=? WHERE codigo=? AND canjeado IS NULL AND vence > ?"
+        parametros = [ahora, normalizar_codigo(codigo), ahora]
+        if centro is not None:
+            consulta += " AND centro=?"
+            parametros.append(centro)
+        with conexion:
+            return conexion.execute(consulta, parametros).rowcount == 1
+
+    def limpiar(self):
+        """Borra los códigos vencidos sin canjear; devuelve cuántos se liberaron."""
+        conexion = self._conexion()
+        with conexion:
+            return conexion.execute(
+                "DELETE FROM turnos WHERE canjeado IS NULL AND vence <= ?", (self._reloj(),)
+            ).rowcount
+
+    def _quizas_limpiar(self):
+        with self._contador_lock:
+            self._emitidos_desde_limpieza += 1
+            if self._emitidos_desde_limpieza < self.limpiar_cada:
+                return
+            self._emitidos_desde_limpieza = 0
+        self.limpiar()
+
+    def _conexion(self):
+        conexion = getattr(self._local, "conexion", None)
+        if conexion is None:
+            conexion = sqlite3.connect(self.ruta, timeout=10)
+            conexion.execute("PRAGMA journal_mode=WAL")
+            conexion.execute("PRAGMA synchronous=NORMAL")
+            self._local.conexion = conexion
+        return conexion
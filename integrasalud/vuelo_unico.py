@@ -0,0 +1,110 @@
+"""Coalescencia de consultas idénticas en curso ("single flight").
+
+Si varias sesiones piden lo mismo a la vez, solo la primera lanza la
+llamada; las demás se suman a ese mismo vuelo, reciben el texto parcial a
+medida que llega y comparten el resultado (o el error).
+
+El vuelo corre en un hilo propio y todos los llamadores, incluido el que lo
+lanzó, solo lo esperan. Así, si una sesión se corta a mitad de camino (por
+ejemplo, Streamlit interrumpe su rerun desde `al_recibir`), el vuelo sigue
+hasta el final para las demás y su resultado se guarda igual. Entre sesiones
+solo se comparten errores comunes (`Exception`), nunca las interrupciones.
+"""
+import threading
+import time
+
+from integrasalud import metricas
+
+
+class _Vuelo:
+    def __init__(self):
+        self.condicion = threading.Condition()
+        self.parcial = None
+        self.version = 0
+        self.terminado = False
+        self.resultado = None
+        self.error = None
+        self.esperando = 0
+
+
+class GrupoVueloUnico:
+    def __init__(self, nombre_metricas="integrasalud_vuelo_unico"):
+        self._lock = threading.Lock()
+        self._vuelos = {}
+        self._nombre = nombre_metricas
+        self.lideres = 0
+        self.coalescidas = 0
+        metricas.REGISTRO.medidor(f"{self._nombre}_en_curso", lambda: len(self._vuelos))
+
+    def ejecutar(self, clave, funcion, al_recibir=None, plazo=None):
+        """Corre `funcion(publicar)` una sola vez por `clave` entre los llamadores concurrentes.
+
+        `funcion` se ejecuta en un hilo aparte; `publicar(texto_parcial)`
+        reenvía el avance a cada llamador, que lo recibe en su `al_recibir`
+        desde su propio hilo. Devuelve (resultado, compartido); `compartido` es
+        True para quienes se sumaron a un vuelo ya lanzado. Si el vuelo no
+        termina en `plazo` segundos, el llamador recibe TimeoutError (el vuelo
+        sigue para los demás).
+        """
+        with self._lock:
+            vuelo = self._vuelos.get(clave)
+            lider = vuelo is None
+            if lider:
+                vuelo = self._vuelos[clave] = _Vuelo()
+                self.lideres += 1
+            else:
+                vuelo.esperando += 1
+                self.coalescidas += 1
+        if lider:
+            metricas.REGISTRO.incrementar(f"{self._nombre}_total", rol="lider")
+            threading.Thread(target=self._volar, args=(clave, vuelo, funcion), name="vuelo-unico", daemon=True).start()
+        else:
+            metricas.REGISTRO.incrementar(f"{self._nombre}_total", rol="en_espera")
+        return self._esperar(vuelo, al_recibir, plazo), not lider
+
+    def _volar(self, clave, vuelo, funcion):
+        def publicar(texto):
+            with vuelo.condicion:
+                vuelo.parcial = texto
+                vuelo.version += 1
+                vuelo.condicion.notify_all()
+
+        try:
+            vuelo.resultado = funcion(publicar)
+        except Exception as error:
+            vuelo.error = error
+        except BaseException:
+            vuelo.error = RuntimeError("la consulta compartida se interrumpió")
+            raise
+        finally:
+            with self._lock:
+                del self._vuelos[clave]
+            with vuelo.condicion:
+                vuelo.terminado = True
+                vuelo.condicion.notify_all()
+
+    @staticmethod
+    def _esperar(vuelo, al_recibir, plazo):
+        limite = None if plazo is None else time.monotonic() + plazo
+        vista = 0
+        with vuelo.condicion:
+            while True:
+                if vuelo.version != vista and vuelo.parcial is not None and not vuelo.terminado:
+                    vista = vuelo.version
+                    if al_recibir is not None:
+                        parcial = vuelo.parcial
+                        vuelo.condicion.release()
+                        try:
+                            al_recibir(parcial)
+                        finally:
+                            vuelo.condicion.acquire()
+                        continue
+                if vuelo.terminado:
+                    break
+                restante = None if limite is None else limite - time.monotonic()
+                if restante is not None and restante <= 0:
+                    raise TimeoutError("la consulta compartida no terminó a tiempo")
+                vuelo.condicion.wait(restante)
+        if vuelo.error is not None:
+            raise vuelo.error
+        return vuelo.resultado
@@ -0,0 +1,43 @@
+import threading
+
+from integrasalud.buscador import IndiceFAQ
+
+
+def test_prioriza_la_clave_mas_larga_y_luego_la_primera():
+    indice = IndiceFAQ({"its": "corta", "ets": "otra", "sintomas de its": "larga"})
+    assert indice.buscar("Cuáles son los síntomas de ITS") == "larga"
+    assert indice.buscar("its o ets") == "corta"
+    assert indice.buscar("nada que ver") is None
+
+
+def test_altas_visibles_antes_y_despues_de_fusionar():
+    indice = IndiceFAQ({"ansiedad": "faq"}, max_recientes=3)
+    for i in range(10):
+        indice.agregar(f"consulta {i}", i)
+        assert indice.buscar(f"una consulta {i} cualquiera") == i
+    assert indice.fusiones >= 2
+    assert indice.buscar("tengo ansiedad") == "faq"
+    indice.agregar("ansiedad", "reemplazada")
+    assert indice.buscar("tengo ansiedad") == "reemplazada"
+    indice.agregar("tengo ansiedad", "mas larga")
+    assert indice.buscar("hoy tengo ansiedad") == "mas larga"
+
+
+def test_busquedas_concurrentes_con_altas():
+    indice = IndiceFAQ({f"clave {i}": i for i in range(200)}, max_recientes=16)
+    errores = []
+
+    def buscar():
+        for _ in range(300):
+            if indice.buscar("la clave 7 de hoy") != 7:
+                errores.append("sin respuesta")
+
+    hilos = [threading.Thread(target=buscar) for _ in range(4)]
+    for hilo in hilos:
+        hilo.start()
+    for i in range(300):
+        indice.agregar(f"nueva {i}", i)
+    for hilo in hilos:
+        hilo.join()
+    assert not errores
+    assert len(indice) == 500
@@ -0,0 +1,63 @@
+from integrasalud.cache_respuestas import CacheRespuestas
+
+
+class Reloj:
+    def __init__(self):
+        self.ahora = 1000.0
+
+    def __call__(self):
+        self.ahora += 1
+        return self.ahora
+
+
+def test_clave_exacta_normalizada():
+    cache = CacheRespuestas()
+    cache.guardar("Salud Sexual", "Qué es el DENGUE", "v1", "respuesta")
+    assert cache.obtener("Salud Sexual", "que es el dengue", "v1") == "respuesta"
+    assert cache.obtener("Salud Sexual", "que es el dengue", "v2") is None
+    assert cache.obtener("Nutrición", "que es el dengue", "v1") is None
+    assert cache.obtener("Salud Sexual", "hola, que es el dengue", "v1") is None
+
+
+def test_desaloja_la_menos_usada(tmp_path):
+    cache = CacheRespuestas(tmp_path / "cache.sqlite3", capacidad=2, reloj=Reloj())
+    cache.guardar("c", "a", "v", "A")
+    cache.guardar("c", "b", "v", "B")
+    assert cache.obtener("c", "a", "v") == "A"
+    cache.guardar("c", "nueva", "v", "N")
+    assert cache.obtener("c", "b", "v") is None
+    assert cache.obtener("c", "a", "v") == "A"
+    assert cache.obtener("c", "nueva", "v") == "N"
+    estadisticas = cache.estadisticas()
+    assert estadisticas["desalojos"] == 1
+    assert estadisticas["en_disco"] == 2
+    assert estadisticas["en_memoria"] <= 2
+
+
+def test_vence_por_ttl():
+    reloj = Reloj()
+    cache = CacheRespuestas(ttl=10, reloj=reloj)
+    cache.guardar("c", "consulta", "v", "R")
+    assert cache.obtener("c", "consulta", "v") == "R"
+    reloj.ahora += 20
+    assert cache.obtener("c", "consulta", "v") is None
+    assert cache.entradas("c", "v") == []
+    assert cache.estadisticas()["expiraciones"] == 1
+
+
+def test_persiste_entre_instancias(tmp_path):
+    ruta = tmp_path / "cache.sqlite3"
+    CacheRespuestas(ruta).guardar("c", "consulta", "v", "R")
+    otra = CacheRespuestas(ruta)
+    assert otra.obtener("c", "consulta", "v") == "R"
+    assert otra.entradas("c", "v") == [("consulta", "R")]
+
+
+def test_contadores():
+    cache = CacheRespuestas()
+    assert cache.obtener("c", "consulta", "v") is None
+    cache.guardar("c", "consulta", "v", "R")
+    cache.obtener("c", "consulta", "v")
+    cache.obtener("c", "consulta", "v")
+    estadisticas = cache.estadisticas()
+    assert (estadisticas["aciertos"], estadisticas["fallos"]) == (2, 1)
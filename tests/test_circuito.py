@@ -0,0 +1,69 @@
+from integrasalud.circuito import ABIERTO, CERRADO, SEMIABIERTO, Circuito
+
+
+class Reloj:
+    def __init__(self):
+        self.ahora = 0.0
+
+    def __call__(self):
+        return self.ahora
+
+
+def _abierto(reloj, **kwargs):
+    circuito = Circuito(minimo_llamadas=2, espera=30, latencia_p95=10, reloj=reloj, **kwargs)
+    for _ in range(2):
+        assert circuito.permitir()
+        circuito.registrar(False, 1.0)
+    assert circuito.estado == ABIERTO
+    return circuito
+
+
+def test_abierto_semiabierto_cerrado():
+    reloj = Reloj()
+    circuito = _abierto(reloj)
+    assert not circuito.permitir()
+    assert not circuito.disponible
+    reloj.ahora = 30
+    assert circuito.disponible
+    assert circuito.permitir()
+    assert circuito.estado == SEMIABIERTO
+    assert not circuito.permitir()  # una sola sonda por vez
+    circuito.registrar(True, 1.0)
+    assert circuito.estado == CERRADO
+    assert circuito.permitir()
+
+
+def test_sonda_fallida_o_lenta_vuelve_a_abrir():
+    reloj = Reloj()
+    circuito = _abierto(reloj)
+    reloj.ahora = 30
+    assert circuito.permitir()
+    circuito.registrar(True, 12.0)
+    assert circuito.estado == ABIERTO
+    assert circuito.aperturas == 2
+    assert not circuito.permitir()
+
+
+def test_sonda_interrumpida_libera_su_lugar():
+    reloj = Reloj()
+    circuito = _abierto(reloj)
+    reloj.ahora = 30
+    assert circuito.permitir()
+    circuito.descartar()  # la sesión se cortó antes de tener resultado
+    assert circuito.estado == SEMIABIERTO
+    assert circuito.permitir()
+    circuito.registrar(True, 1.0)
+    assert circuito.estado == CERRADO
+
+
+def test_sonda_perdida_vence():
+    reloj = Reloj()
+    circuito = _abierto(reloj, plazo_sonda=60)
+    reloj.ahora = 30
+    assert circuito.permitir()  # nunca registra ni descarta
+    reloj.ahora = 60
+    assert not circuito.permitir()
+    reloj.ahora = 90
+    assert circuito.permitir()
+    circuito.registrar(True, 1.0)
+    assert circuito.estado == CERRADO
@@ -0,0 +1,39 @@
+from pathlib import Path
+
+import pytest
+
+from integrasalud.catalogo import Catalogo
+from integrasalud.correccion import Corrector
+
+CONTENIDO = Path(__file__).resolve().parent.parent / "contenido.toml"
+
+
+@pytest.fixture(scope="module")
+def corrector():
+    return Catalogo.desde_archivo(CONTENIDO).corrector
+
+
+@pytest.mark.parametrize("palabra", [
+    "beso", "casa", "papa", "pasta", "cuidado", "queso", "fiesta", "trabajo", "cielo", "carta", "videos",
+])
+def test_no_toca_palabras_validas(corrector, palabra):
+    assert corrector.corregir(palabra) == palabra
+
+
+@pytest.mark.parametrize("escrita, esperada", [
+    ("anticonseptivos", "anticonceptivos"),
+    ("preserbativo", "preservativo"),
+    ("tengo ansiedaz", "tengo ansiedad"),
+    ("protenias", "proteinas"),
+    ("contajio", "contagio"),
+])
+def test_corrige_errores_de_tipeo(corrector, escrita, esperada):
+    assert corrector.corregir(escrita) == esperada
+
+
+def test_no_corrige_hacia_palabras_sin_peso():
+    corrector = Corrector({"pasa": 0, "pastilla": 1})
+    assert corrector.corregir("pasta") == "pasta"
+    assert corrector.corregir("pastila") == "pastilla"
+    corrector = Corrector({"cuidado": 0, "cuidados": 1})
+    assert corrector.corregir("cuidadi") == "cuidadi"
@@ -0,0 +1,122 @@
+import threading
+import time
+
+import pytest
+
+from integrasalud import ejecutor
+from integrasalud.ejecutor import EjecutorLLM, PlazoAgotadoLLM, SaturacionLLM
+
+
+@pytest.fixture
+def esperas(monkeypatch):
+    """Registra los topes del jitter y no espera de verdad."""
+    topes = []
+
+    def uniform(a, b):
+        topes.append(b)
+        return 0.0
+
+    monkeypatch.setattr(ejecutor.random, "uniform", uniform)
+    return topes
+
+
+def _fallar(veces, resultado, error=ConnectionError):
+    llamadas = []
+
+    def funcion(restante):
+        llamadas.append(restante)
+        if len(llamadas) <= veces:
+            raise error("caído")
+        return resultado
+
+    return funcion, llamadas
+
+
+def test_rechaza_rapido_con_la_cola_llena():
+    pool = EjecutorLLM(max_concurrencia=1, max_cola=1, plazo=5)
+    seguir = threading.Event()
+    hilos = [threading.Thread(target=pool.ejecutar, args=(lambda _: seguir.wait(5),)) for _ in range(2)]
+    for hilo in hilos:
+        hilo.start()
+    while pool.en_curso + pool.en_cola < 2:
+        time.sleep(0.01)
+
+    inicio = time.monotonic()
+    with pytest.raises(SaturacionLLM):
+        pool.ejecutar(lambda _: "no llega")
+    assert time.monotonic() - inicio < 0.5
+    seguir.set()
+    for hilo in hilos:
+        hilo.join(5)
+    assert pool.metricas()["rechazadas"] == 1
+    assert pool.ejecutar(lambda _: "libre") == "libre"
+
+
+def test_plazo_por_consulta():
+    pool = EjecutorLLM(max_concurrencia=1, plazo=5)
+    seguir = threading.Event()
+    restantes = []
+
+    def lenta(restante):
+        restantes.append(restante)
+        seguir.wait(5)
+
+    inicio = time.monotonic()
+    with pytest.raises(PlazoAgotadoLLM):
+        pool.ejecutar(lenta, plazo=0.05)
+    assert time.monotonic() - inicio < 1
+    assert 0 < restantes[0] <= 0.05
+    seguir.set()
+    assert pool.metricas()["plazos_agotados"] == 1
+
+
+def test_reintenta_transitorios_con_espera_exponencial(esperas):
+    pool = EjecutorLLM(reintentos=2, espera_base=0.5, espera_max=8.0)
+    funcion, llamadas = _fallar(2, "ok")
+    assert pool.ejecutar(funcion) == "ok"
+    assert len(llamadas) == 3
+    assert esperas == [0.5, 1.0]
+    assert pool.metricas()["reintentos"] == 2
+
+    funcion, llamadas = _fallar(5, "ok")
+    with pytest.raises(ConnectionError):
+        pool.ejecutar(funcion)
+    assert len(llamadas) == 3  # el intento original más 2 reintentos
+
+
+def test_no_reintenta_errores_no_transitorios(esperas):
+    pool = EjecutorLLM(reintentos=2)
+    funcion, llamadas = _fallar(1, "ok", error=ValueError)
+    with pytest.raises(ValueError):
+        pool.ejecutar(funcion)
+    assert len(llamadas) == 1
+    assert esperas == []
+
+
+def test_transmision_reintenta_solo_antes_del_primer_fragmento(esperas):
+    pool = EjecutorLLM(reintentos=2)
+    llamadas = []
+
+    def falla_al_abrir(restante):
+        llamadas.append(restante)
+        if len(llamadas) == 1:
+            raise ConnectionError("caído")
+        yield from ["hola", " mundo"]
+
+    assert list(pool.transmitir(falla_al_abrir)) == ["hola", " mundo"]
+    assert len(llamadas) == 2
+
+    llamadas.clear()
+
+    def se_corta(restante):
+        llamadas.append(restante)
+        yield "hola"
+        raise ConnectionError("se cortó")
+
+    recibidos = []
+    with pytest.raises(ConnectionError):
+        for fragmento in pool.transmitir(se_corta):
+            recibidos.append(fragmento)
+    assert recibidos == ["hola"]
+    assert len(llamadas) == 1
+    assert pool.metricas()["reintentos"] == 1
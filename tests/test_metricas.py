@@ -0,0 +1,16 @@
+from integrasalud.metricas import Registro, medidor_desde_dict
+
+
+def test_totales_como_contadores_y_estado_como_medidores():
+    registro = Registro()
+    estadisticas = lambda: {"aciertos": 3, "en_memoria": 2, "nombre": "no numérico"}
+    registro.medidor("cache_total", medidor_desde_dict(estadisticas, claves=("aciertos",)),
+                     tipo="counter", ayuda="Eventos del cache.")
+    registro.medidor("cache", medidor_desde_dict(estadisticas, excluir=("aciertos",)))
+    assert registro.exportar_prometheus().splitlines() == [
+        "# TYPE cache gauge",
+        'cache{serie="en_memoria"} 2',
+        "# HELP cache_total Eventos del cache.",
+        "# TYPE cache_total counter",
+        'cache_total{serie="aciertos"} 3',
+    ]
@@ -0,0 +1,56 @@
+import json
+import time
+
+from integrasalud.cache_respuestas import CacheRespuestas
+from integrasalud.registro_consultas import (
+    _tomar_bloqueo, escribir_promovidas, leer_promovidas, promover, sembrado_promovidas,
+)
+
+
+def _registros(directorio, consulta, veces):
+    with open(directorio / "consultas-1.jsonl", "a", encoding="utf-8") as archivo:
+        for _ in range(veces):
+            registro = {"t": time.time(), "categoria": "Salud Sexual", "consulta": consulta, "ruta": "online", "segundos": 1.0}
+            archivo.write(json.dumps(registro) + "\n")
+
+
+def test_promueve_como_candidata_y_siembra_solo_las_aprobadas(tmp_path):
+    cache = CacheRespuestas()
+    cache.guardar("Salud Sexual", "que es el dengue", "v1", "respuesta del modelo")
+    _registros(tmp_path, "que es el dengue", 3)
+    ruta = tmp_path / "promovidas.toml"
+
+    assert promover(tmp_path, cache, {"Salud Sexual": "v1"}, ruta) == {"Salud Sexual": 1}
+    promovidas = leer_promovidas(ruta)
+    assert promovidas["Salud Sexual"]["que es el dengue"]["aprobada"] is False
+    assert sembrado_promovidas(promovidas)("Salud Sexual", "v1") == []
+
+    promovidas["Salud Sexual"]["que es el dengue"].update(respuesta="texto revisado", aprobada=True)
+    escribir_promovidas(ruta, promovidas)
+    _registros(tmp_path, "que es el dengue", 2)
+    assert promover(tmp_path, cache, {"Salud Sexual": "v1"}, ruta) == {}
+    promovidas = leer_promovidas(ruta)
+    assert promovidas["Salud Sexual"]["que es el dengue"]["veces"] == 5
+    assert sembrado_promovidas(promovidas)("Salud Sexual", "v1") == [("que es el dengue", "texto revisado")]
+    assert sembrado_promovidas(promovidas)("Salud Sexual", "v2") == []
+
+
+def test_no_reescribe_si_nada_cambio(tmp_path):
+    ruta = tmp_path / "promovidas.toml"
+    promovidas = {"Salud Sexual": {"que es el dengue": {"respuesta": "R", "version": "v1", "veces": 3}}}
+    assert escribir_promovidas(ruta, promovidas)
+    assert not escribir_promovidas(ruta, promovidas)
+    promovidas["Salud Sexual"]["que es el dengue"]["veces"] = 4
+    assert escribir_promovidas(ruta, promovidas)
+    assert [p.name for p in tmp_path.iterdir()] == ["promovidas.toml"]
+
+
+def test_un_solo_proceso_toma_el_bloqueo(tmp_path):
+    ruta = tmp_path / "promovidas.toml.lock"
+    primero = _tomar_bloqueo(ruta)
+    assert primero is not None
+    assert _tomar_bloqueo(ruta) is None
+    primero.close()
+    segundo = _tomar_bloqueo(ruta)
+    assert segundo is not None
+    segundo.close()
@@ -0,0 +1,62 @@
+from pathlib import Path
+
+import pytest
+
+from integrasalud.catalogo import Catalogo
+from integrasalud.semantico import IndiceSemantico
+
+CONTENIDO = Path(__file__).resolve().parent.parent / "contenido.toml"
+
+
+@pytest.fixture(scope="module")
+def catalogo():
+    return Catalogo.desde_archivo(CONTENIDO)
+
+
+@pytest.mark.parametrize("consulta", [
+    "como me cuido del dengue",
+    "me puedo contagiar de covid",
+    "estoy embarazada y tomo alcohol",
+    "perdi el trabajo",
+])
+def test_no_responde_temas_ajenos_por_parecido_superficial(catalogo, consulta):
+    for categoria in catalogo.categorias:
+        respuesta, _ = catalogo.indices_semanticos[categoria].buscar(consulta)
+        assert respuesta is None, (categoria, consulta)
+
+
+@pytest.mark.parametrize("categoria, consulta, clave", [
+    ("Salud Mental", "me siento nervioso", "ansiedad"),
+    ("Salud Mental", "ataque de panico", "ansiedad"),
+    ("Salud Mental", "estoy muy estresado por el trabajo", "estrés"),
+    ("Salud Sexual", "como evito un embarazo", "anticonceptivos"),
+    ("Nutrición", "las harinas me hacen engordar", "carbohidratos"),
+])
+def test_responde_variantes_de_frases_conocidas(catalogo, categoria, consulta, clave):
+    respuesta, _ = catalogo.indices_semanticos[categoria].buscar(consulta)
+    assert respuesta == catalogo[categoria]["preguntas_frecuentes"][clave]
+
+
+def test_exige_una_palabra_en_comun():
+    indice = IndiceSemantico(umbral=0.3)
+    indice.agregar("ataques de nervios", "nervios")
+    assert indice.buscar("ataque nervioso")[0] is None
+    assert indice.buscar("ataque de nervios")[0] == "nervios"
+
+
+def test_consultas_del_cache_se_resuelven_y_olvidan():
+    cache = {"que es el dengue": "mosquito"}
+    indice = IndiceSemantico(max_consultas=2)
+    indice.agregar("ansiedad", "faq")
+    indice.agregar("que es el dengue")
+    assert indice.buscar("que es dengue", cache.get)[0] == "mosquito"
+    assert indice.buscar("que es dengue")[0] is None  # sin cache no hay respuesta
+
+    del cache["que es el dengue"]  # vencida o desalojada
+    assert indice.buscar("que es dengue", cache.get)[0] is None
+    assert len(indice) == 1
+
+    for consulta in ["sintomas del zika", "sintomas de la malaria", "sintomas de la gripe"]:
+        indice.agregar(consulta)
+    assert len(indice) == 3  # la curada más las 2 consultas más nuevas
+    assert indice.buscar("ansiedad")[0] == "faq"
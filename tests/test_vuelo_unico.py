@@ -0,0 +1,96 @@
+import threading
+import time
+
+import pytest
+
+from integrasalud.vuelo_unico import GrupoVueloUnico
+
+
+class Interrumpido(BaseException):
+    """Como StopException/RerunException de Streamlit: no hereda de Exception."""
+
+
+def _lanzar(grupo, clave, funcion, resultados, al_recibir=None, plazo=5):
+    def correr():
+        try:
+            resultados.append(grupo.ejecutar(clave, funcion, al_recibir=al_recibir, plazo=plazo))
+        except BaseException as error:
+            resultados.append(error)
+
+    hilo = threading.Thread(target=correr)
+    hilo.start()
+    return hilo
+
+
+def test_el_corte_del_lider_no_afecta_a_los_demas():
+    grupo = GrupoVueloUnico("test_vuelo_corte")
+    arranco, seguir = threading.Event(), threading.Event()
+    guardadas = []
+
+    def funcion(publicar):
+        arranco.set()
+        publicar("hola")
+        seguir.wait(5)
+        publicar("hola mundo")
+        guardadas.append("hola mundo")  # lo que en la app es cache.guardar()
+        return "hola mundo"
+
+    def al_recibir_lider(_):
+        raise Interrumpido()
+
+    del_lider, de_otros = [], []
+    lider = _lanzar(grupo, "clave", funcion, del_lider, al_recibir=al_recibir_lider)
+    assert arranco.wait(5)
+    parciales = []
+    otros = [_lanzar(grupo, "clave", funcion, de_otros, al_recibir=parciales.append) for _ in range(3)]
+    while grupo.coalescidas < 3:
+        time.sleep(0.01)
+    seguir.set()
+    for hilo in [lider, *otros]:
+        hilo.join(5)
+
+    assert isinstance(del_lider[0], Interrumpido)
+    assert de_otros == [("hola mundo", True)] * 3
+    assert guardadas == ["hola mundo"]
+    assert grupo.lideres == 1
+
+
+def test_comparte_errores_comunes():
+    grupo = GrupoVueloUnico("test_vuelo_error")
+    seguir = threading.Event()
+
+    def funcion(publicar):
+        seguir.wait(5)
+        raise ValueError("sin cuota")
+
+    resultados = []
+    hilos = [_lanzar(grupo, "clave", funcion, resultados)]
+    while not grupo.lideres:
+        time.sleep(0.01)
+    hilos.append(_lanzar(grupo, "clave", funcion, resultados))
+    while not grupo.coalescidas:
+        time.sleep(0.01)
+    seguir.set()
+    for hilo in hilos:
+        hilo.join(5)
+    assert [type(r) for r in resultados] == [ValueError, ValueError]
+
+
+def test_plazo_vencido_no_corta_el_vuelo():
+    grupo = GrupoVueloUnico("test_vuelo_plazo")
+    seguir = threading.Event()
+    guardadas = []
+
+    def funcion(publicar):
+        seguir.wait(5)
+        guardadas.append("listo")
+        return "listo"
+
+    with pytest.raises(TimeoutError):
+        grupo.ejecutar("clave", funcion, plazo=0.05)
+    seguir.set()
+    resultado, _ = grupo.ejecutar("otra", lambda publicar: "nueva", plazo=5)
+    assert resultado == "nueva"
+    while not guardadas:
+        time.sleep(0.01)
+    assert guardadas == ["listo"]